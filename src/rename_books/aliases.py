@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from itertools import pairwise
+from json import JSONDecodeError, dumps, loads
+from logging import getLogger
+from re import findall
+from typing import TYPE_CHECKING, Self
+from unicodedata import combining, normalize
+
+from utilities.core import write_text
+
+from rename_books.constants import DATA_PATH
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+    from pathlib import Path
+
+
+_LOGGER = getLogger(__name__)
+ALIASES_PATH = DATA_PATH.joinpath("aliases.json")
+
+
+def alias_key(name: str, /) -> str:
+    """Get the key under which equivalent spellings of a name coincide.
+
+    The key is casefolded and stripped of accents and punctuation, runs of
+    initials are merged, and a 'Surname, Given' name is inverted; hence
+    'J. R. R. Tolkien', 'JRR Tolkien' and 'Tolkien, J.R.R.' all have the key
+    'jrr tolkien'. The order of the tokens is otherwise kept, so 'Li Wei' and
+    'Wei Li' remain distinct.
+    """
+    decomposed = normalize("NFKD", name.casefold())
+    stripped = "".join(c for c in decomposed if not combining(c))
+    match stripped.split(","):
+        case [surname, given]:
+            stripped = f"{given} {surname}"
+        case _:
+            pass
+    tokens: list[str] = []
+    initials = ""
+    for token in findall(r"[^\W_]+", stripped):
+        if len(token) == 1:
+            initials += token
+            continue
+        if initials:
+            tokens.append(initials)
+            initials = ""
+        tokens.append(token)
+    if initials:
+        tokens.append(initials)
+    return " ".join(tokens)
+
+
+@dataclass(kw_only=True)
+class AliasStore:
+    """A store of author aliases, each group headed by its canonical name.
+
+    Groups sharing a key, or explicitly merged, are unioned into one; the
+    canonical name of a union is the head of its earliest group.
+    """
+
+    path: Path = ALIASES_PATH
+    groups: list[list[str]] = field(default_factory=list)
+    _index: dict[str, str] = field(default_factory=dict, init=False, repr=False)
+    _inverted: dict[str, str] = field(default_factory=dict, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self._rebuild()
+
+    def __len__(self) -> int:
+        return len(self.groups)
+
+    def add(self, names: Iterable[str], /) -> None:
+        """Add spellings, such as those found in a library.
+
+        A new group is headed by its most common spelling.
+        """
+        counts = Counter(names)
+        by_key: defaultdict[str, list[str]] = defaultdict(list)
+        for name, _ in counts.most_common():
+            if (key := alias_key(name)) != "":
+                by_key[key].append(name)
+        self.groups.extend(by_key.values())
+        self._rebuild()
+
+    def canonicalize(self, name: str, /) -> str:
+        """Get the canonical spelling of a name, or the name itself."""
+        canonical = self.get(name)
+        return name if canonical is None else canonical
+
+    def get(self, name: str, /) -> str | None:
+        """Get the canonical spelling of a name, if it is known."""
+        if len(self._index) == 0:
+            return None
+        return self._index.get(alias_key(name))
+
+    def get_inverted(self, name: str, /) -> str | None:
+        """Get the canonical spelling of a 'Surname, Given' name, if it is known.
+
+        Only spellings stored in that form match, since otherwise 'Li, Wei'
+        would be read as the single author 'Wei Li' rather than two authors.
+        """
+        if len(self._inverted) == 0:
+            return None
+        return self._inverted.get(alias_key(name))
+
+    @classmethod
+    def load(cls, path: Path = ALIASES_PATH, /) -> Self:
+        """Load the store, if it exists."""
+        try:
+            groups: list[list[str]] = loads(path.read_text())
+        except FileNotFoundError:
+            return cls(path=path)
+        except JSONDecodeError:
+            _LOGGER.warning("Ignoring invalid aliases %r", str(path))
+            return cls(path=path)
+        return cls(path=path, groups=groups)
+
+    def merge(self, canonical: str, /, *aliases: str) -> None:
+        """Merge a set of names, and all their aliases, under a canonical name."""
+        self.groups.insert(0, [canonical, *aliases])
+        self._rebuild()
+
+    def save(self) -> None:
+        """Save the store."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        write_text(self.path, dumps(self.groups, indent=2), overwrite=True)
+
+    def _rebuild(self) -> None:
+        union_find = _UnionFind()
+        for group in self.groups:
+            keys = [k for name in group if (k := alias_key(name)) != ""]
+            for key in keys:
+                union_find.add(key)
+            for first, second in pairwise(keys):
+                union_find.union(first, second)
+        merged: dict[str, list[str]] = {}
+        for group in self.groups:
+            for name in group:
+                if (key := alias_key(name)) == "":
+                    continue
+                names = merged.setdefault(union_find.find(key), [])
+                if name not in names:
+                    names.append(name)
+        self.groups = list(merged.values())
+        self._index = {
+            alias_key(name): group[0] for group in self.groups for name in group
+        }
+        self._inverted = {
+            alias_key(name): group[0]
+            for group in self.groups
+            for name in group
+            if "," in name
+        }
+
+
+@dataclass(kw_only=True, slots=True)
+class _UnionFind:
+    """A disjoint-set forest, with path compression and union by size."""
+
+    parents: dict[str, str] = field(default_factory=dict)
+    sizes: dict[str, int] = field(default_factory=dict)
+
+    def add(self, item: str, /) -> None:
+        if item not in self.parents:
+            self.parents[item] = item
+            self.sizes[item] = 1
+
+    def find(self, item: str, /) -> str:
+        root = item
+        while (parent := self.parents[root]) != root:
+            root = parent
+        while (parent := self.parents[item]) != root:
+            self.parents[item] = root
+            item = parent
+        return root
+
+    def union(self, first: str, second: str, /) -> None:
+        first, second = self.find(first), self.find(second)
+        if first == second:
+            return
+        if self.sizes[first] < self.sizes[second]:
+            first, second = second, first
+        self.parents[second] = first
+        self.sizes[first] += self.sizes[second]
+
+
+_aliases: AliasStore | None = None
+
+
+def get_aliases() -> AliasStore:
+    """Get the alias store used when parsing, loading it on first use."""
+    global _aliases  # noqa: PLW0603
+    if _aliases is None:
+        _aliases = AliasStore.load()
+    return _aliases
+
+
+def set_aliases(aliases: AliasStore | None, /) -> None:
+    """Set the alias store used when parsing; None reloads it on next use."""
+    global _aliases  # noqa: PLW0603
+    _aliases = aliases
+
+
+__all__ = ["ALIASES_PATH", "AliasStore", "alias_key", "get_aliases", "set_aliases"]
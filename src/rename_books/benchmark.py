@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass
+from itertools import pairwise
+from json import dumps
+from logging import getLogger
+from math import log
+from pathlib import Path
+from random import Random
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import TYPE_CHECKING
+
+from utilities.core import write_text
+
+from rename_books.classes import (
+    MetaData,
+    MetaDataFromPathError,
+    MetaDataWithAllMetaDataError,
+)
+from rename_books.filesystem import LOCAL_FILESYSTEM, MemoryFileSystem
+from rename_books.formats import detect_format
+from rename_books.lib import _needs_processing, get_next_file
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable
+
+    from rename_books.filesystem import FileSystem
+
+
+_LOGGER = getLogger(__name__)
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+
+
+@dataclass(kw_only=True, slots=True)
+class BenchmarkResult:
+    """The timings for a synthetic inbox of a given size."""
+
+    n: int
+    get_next_file: float
+    needs_processing: float
+    drain: float
+    drain_items: int
+
+    @property
+    def drain_per_item(self) -> float:
+        """The time taken to drain a single item from the inbox."""
+        return self.drain / max(self.drain_items, 1)
+
+
+_HEADERS = {
+    ".epub": b"PK\x03\x04" + bytes(26) + b"mimetypeapplication/epub+zip",
+    ".pdf": b"%PDF-1.7\n",
+}
+
+
+def make_inbox(
+    path: Path, n: int, /, *, seed: int = 0, filesystem: FileSystem = LOCAL_FILESYSTEM
+) -> None:
+    """Populate a directory with a synthetic inbox of files."""
+    rng = Random(seed)
+    for i in range(n):
+        suffix = rng.choice([".epub", ".pdf"])
+        match rng.choice(["normalized", "non-normalized", "part", "unrelated"]):
+            case "normalized":
+                name = f"2000 — Title {i} (Author)"
+            case "non-normalized":
+                name = f"Author - Title {i} ({rng.randint(1900, 2025)})"
+            case "part":
+                name, suffix = f"Title {i}{suffix}", ".part"
+            case _:
+                name = f"Title {i}"
+                suffix = rng.choice([".jpg", ".txt", ".download"])
+        filesystem.write_bytes(
+            path.joinpath(f"{name}{suffix}"), _HEADERS.get(suffix, b"junk\n")
+        )
+
+
+def drain(
+    path: Path,
+    /,
+    *,
+    limit: int | None = None,
+    filesystem: FileSystem = LOCAL_FILESYSTEM,
+) -> int:
+    """Drain an inbox non-interactively, normalizing or skipping each file."""
+    skips: set[Path] = set()
+    count = 0
+    while ((limit is None) or (count < limit)) and (
+        (file := get_next_file(path=path, skips=skips, filesystem=filesystem))
+        is not None
+    ):
+        try:
+            target = MetaData.normalize(
+                file, suffix=detect_format(file, filesystem=filesystem)
+            )
+        except (MetaDataFromPathError, MetaDataWithAllMetaDataError):
+            skips.add(file)
+        else:
+            if filesystem.exists(target):
+                skips.add(file)
+            else:
+                filesystem.rename(file, target)
+        count += 1
+    return count
+
+
+def run_benchmark(
+    *,
+    sizes: Iterable[int] = DEFAULT_SIZES,
+    drain_limit: int | None = 10,
+    repeats: int = 3,
+    seed: int = 0,
+    memory: bool = False,
+) -> list[BenchmarkResult]:
+    """Time the inbox loop against synthetic inboxes of increasing size.
+
+    With `memory`, the inboxes are held in memory rather than on disk.
+    """
+    results: list[BenchmarkResult] = []
+    for n in sizes:
+        result = _run_one(
+            n, drain_limit=drain_limit, repeats=repeats, seed=seed, memory=memory
+        )
+        _LOGGER.info("%s", result)
+        results.append(result)
+    return results
+
+
+def scaling_exponents(results: Iterable[BenchmarkResult], /) -> list[dict[str, float]]:
+    """Estimate the log-log slope of each stage between consecutive sizes.
+
+    A slope of 1 indicates linear scaling; a slope of 2 indicates quadratic.
+    """
+    results = list(results)
+    exponents: list[dict[str, float]] = []
+    for prev, curr in pairwise(results):
+        ratio = log(curr.n / prev.n)
+        exponents.append({
+            "n": curr.n,
+            "get_next_file": _slope(prev.get_next_file, curr.get_next_file, ratio),
+            "needs_processing": _slope(
+                prev.needs_processing, curr.needs_processing, ratio
+            ),
+            "drain_per_item": _slope(prev.drain_per_item, curr.drain_per_item, ratio),
+        })
+    return exponents
+
+
+def write_benchmark(path: Path, results: Iterable[BenchmarkResult], /) -> None:
+    """Write the scaling curve to a JSON file."""
+    results = list(results)
+    data = {
+        "results": [{**asdict(r), "drain_per_item": r.drain_per_item} for r in results],
+        "exponents": scaling_exponents(results),
+    }
+    write_text(path, dumps(data, indent=2), overwrite=True)
+
+
+def _run_one(
+    n: int,
+    /,
+    *,
+    drain_limit: int | None = 10,
+    repeats: int = 3,
+    seed: int = 0,
+    memory: bool = False,
+) -> BenchmarkResult:
+    if memory:
+        filesystem = MemoryFileSystem()
+        filesystem.mkdir(path := Path("/inbox"))
+        return _run_in(
+            path,
+            n,
+            drain_limit=drain_limit,
+            repeats=repeats,
+            seed=seed,
+            filesystem=filesystem,
+        )
+    with TemporaryDirectory() as temp:
+        return _run_in(
+            Path(temp), n, drain_limit=drain_limit, repeats=repeats, seed=seed
+        )
+
+
+def _run_in(
+    path: Path,
+    n: int,
+    /,
+    *,
+    drain_limit: int | None = 10,
+    repeats: int = 3,
+    seed: int = 0,
+    filesystem: FileSystem = LOCAL_FILESYSTEM,
+) -> BenchmarkResult:
+    make_inbox(path, n, seed=seed, filesystem=filesystem)
+    paths = list(filesystem.iterdir(path))
+    time_next = _time(
+        lambda: get_next_file(path=path, filesystem=filesystem), repeats=repeats
+    )
+    time_needs = _time(
+        lambda: sum(_needs_processing(p, filesystem=filesystem) for p in paths),
+        repeats=repeats,
+    )
+    start = perf_counter()
+    items = drain(path, limit=drain_limit, filesystem=filesystem)
+    time_drain = perf_counter() - start
+    return BenchmarkResult(
+        n=n,
+        get_next_file=time_next,
+        needs_processing=time_needs,
+        drain=time_drain,
+        drain_items=items,
+    )
+
+
+def _slope(prev: float, curr: float, ratio: float, /) -> float:
+    if (prev <= 0.0) or (curr <= 0.0):
+        return 0.0
+    return log(curr / prev) / ratio
+
+
+def _time(func: Callable[[], object], /, *, repeats: int = 3) -> float:
+    timings: list[float] = []
+    for _ in range(repeats):
+        start = perf_counter()
+        _ = func()
+        timings.append(perf_counter() - start)
+    return min(timings)
+
+
+__all__ = [
+    "DEFAULT_SIZES",
+    "BenchmarkResult",
+    "drain",
+    "make_inbox",
+    "run_benchmark",
+    "scaling_exponents",
+    "write_benchmark",
+]
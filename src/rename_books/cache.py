@@ -0,0 +1,223 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from itertools import batched
+from json import dumps, loads
+from sqlite3 import Connection, connect
+from typing import TYPE_CHECKING, Any, Self
+
+from rename_books.constants import DATA_PATH
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Mapping
+    from pathlib import Path
+    from types import TracebackType
+
+
+CACHE_PATH = DATA_PATH.joinpath("cache.sqlite")
+_BATCH_SIZE = 500
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    device INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    accessed INTEGER NOT NULL,
+    PRIMARY KEY (device, inode, key, size, mtime_ns)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed);
+"""
+
+
+@dataclass(order=True, unsafe_hash=True, kw_only=True, slots=True)
+class FileIdentity:
+    """The identity of a file's contents, independent of its path."""
+
+    device: int
+    inode: int
+    size: int
+    mtime_ns: int
+
+    @classmethod
+    def from_path(cls, path: Path, /) -> Self:
+        """Construct the identity of a file from a Path."""
+        stat = path.stat()
+        return cls(
+            device=stat.st_dev,
+            inode=stat.st_ino,
+            size=stat.st_size,
+            mtime_ns=stat.st_mtime_ns,
+        )
+
+    @property
+    def to_tuple(self) -> tuple[int, int, int, int]:
+        """The identity as a tuple."""
+        return self.device, self.inode, self.size, self.mtime_ns
+
+
+@dataclass(kw_only=True)
+class ContentCache:
+    """A cache of metadata derived from file contents, keyed by file identity.
+
+    Entries survive renames, since neither the device, the inode, the size nor
+    the modification time of a file change when it is renamed.
+    """
+
+    path: Path = CACHE_PATH
+    max_entries: int = 100_000
+    hits: int = field(default=0, init=False)
+    misses: int = field(default=0, init=False)
+    _conn: Connection = field(init=False, repr=False)
+    _clock: int = field(default=0, init=False, repr=False)
+    _count: int = field(default=0, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = connect(self.path, check_same_thread=False)
+        _ = self._conn.executescript(_SCHEMA)
+        _ = self._conn.execute("PRAGMA journal_mode = WAL")
+        (clock,) = self._conn.execute(
+            "SELECT coalesce(max(accessed), 0) FROM entries"
+        ).fetchone()
+        self._clock = clock
+        (count,) = self._conn.execute("SELECT count(*) FROM entries").fetchone()
+        self._count = count
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+        /,
+    ) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def close(self) -> None:
+        """Close the cache."""
+        self._conn.close()
+
+    def evict(self) -> int:
+        """Evict the least recently used entries beyond the maximum size.
+
+        Entries written together share an access time, so ties are broken by
+        key and exactly the excess is evicted.
+        """
+        if (excess := len(self) - self.max_entries) <= 0:
+            return 0
+        with self._conn:
+            cursor = self._conn.execute(
+                """
+                DELETE FROM entries WHERE (device, inode, key, size, mtime_ns) IN (
+                    SELECT device, inode, key, size, mtime_ns FROM entries
+                    ORDER BY accessed, device, inode, key, size, mtime_ns LIMIT ?
+                )
+                """,
+                (excess,),
+            )
+        self._count -= cursor.rowcount
+        return cursor.rowcount
+
+    def get(self, identity: FileIdentity, key: str, /) -> Any:
+        """Get a cached value, if it exists."""
+        return self.get_many([identity], key).get(identity)
+
+    def get_many(
+        self, identities: Iterable[FileIdentity], key: str, /
+    ) -> dict[FileIdentity, Any]:
+        """Get a set of cached values, omitting those which do not exist."""
+        identities = set(identities)
+        found: dict[FileIdentity, Any] = {}
+        for batch in batched(identities, _BATCH_SIZE):
+            placeholders = ", ".join(["(?, ?, ?, ?)"] * len(batch))
+            rows = self._conn.execute(
+                f"""
+                SELECT device, inode, size, mtime_ns, value FROM entries
+                WHERE key = ? AND (device, inode, size, mtime_ns) IN (VALUES {placeholders})
+                """,  # noqa: S608
+                [key, *(v for i in batch for v in i.to_tuple)],
+            ).fetchall()
+            for device, inode, size, mtime_ns, value in rows:
+                identity = FileIdentity(
+                    device=device, inode=inode, size=size, mtime_ns=mtime_ns
+                )
+                found[identity] = loads(value)
+        self.hits += len(found)
+        self.misses += len(identities) - len(found)
+        if len(found) >= 1:
+            self._clock += 1
+            with self._conn:
+                _ = self._conn.executemany(
+                    """
+                    UPDATE entries SET accessed = ?
+                    WHERE device = ? AND inode = ? AND size = ? AND mtime_ns = ?
+                        AND key = ?
+                    """,
+                    [(self._clock, *i.to_tuple, key) for i in found],
+                )
+        return found
+
+    @property
+    def hit_rate(self) -> float:
+        """The fraction of lookups which were served from the cache."""
+        total = self.hits + self.misses
+        return 0.0 if total == 0 else self.hits / total
+
+    def invalidate(self, paths: Iterable[Path], /) -> int:
+        """Drop the entries for stale versions of a set of scanned files."""
+        return self.invalidate_identities(
+            FileIdentity.from_path(p) for p in paths if p.is_file()
+        )
+
+    def invalidate_identities(self, identities: Iterable[FileIdentity], /) -> int:
+        """Drop the entries for stale versions of a set of file identities."""
+        with self._conn:
+            cursor = self._conn.executemany(
+                """
+                DELETE FROM entries
+                WHERE device = ? AND inode = ? AND (size != ? OR mtime_ns != ?)
+                """,
+                [i.to_tuple for i in identities],
+            )
+        self._count -= cursor.rowcount
+        return cursor.rowcount
+
+    def put(self, identity: FileIdentity, key: str, value: Any, /) -> None:
+        """Cache a value."""
+        self.put_many({identity: value}, key)
+
+    def put_many(self, values: Mapping[FileIdentity, Any], key: str, /) -> None:
+        """Cache a set of values, evicting old entries if necessary."""
+        self._clock += 1
+        present = self._count_present(values, key)
+        with self._conn:
+            _ = self._conn.executemany(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(*i.to_tuple, key, dumps(v), self._clock) for i, v in values.items()],
+            )
+        self._count += len(values) - present
+        _ = self.evict()
+
+    def _count_present(self, identities: Iterable[FileIdentity], key: str, /) -> int:
+        count = 0
+        for batch in batched(identities, _BATCH_SIZE):
+            placeholders = ", ".join(["(?, ?, ?, ?)"] * len(batch))
+            (n,) = self._conn.execute(
+                f"""
+                SELECT count(*) FROM entries
+                WHERE key = ? AND (device, inode, size, mtime_ns) IN (VALUES {placeholders})
+                """,  # noqa: S608
+                [key, *(v for i in batch for v in i.to_tuple)],
+            ).fetchone()
+            count += n
+        return count
+
+
+__all__ = ["CACHE_PATH", "ContentCache", "FileIdentity"]
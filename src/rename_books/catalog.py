@@ -0,0 +1,336 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from gzip import open as gzip_open
+from itertools import batched
+from json import JSONDecodeError, dumps, loads
+from logging import getLogger
+from re import findall, search, sub
+from sqlite3 import Connection, connect
+from typing import TYPE_CHECKING, Any, Self, cast
+
+from rename_books.classes import AuthorEtAl, StemMetaData, StemMetaDataFromTextError
+from rename_books.constants import DATA_PATH
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from pathlib import Path
+    from types import TracebackType
+
+
+_LOGGER = getLogger(__name__)
+CATALOG_PATH = DATA_PATH.joinpath("catalog.sqlite")
+_SEP = "\x1f"
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS books (
+    id INTEGER PRIMARY KEY,
+    key TEXT UNIQUE,
+    title TEXT NOT NULL,
+    subtitle TEXT,
+    year INTEGER,
+    author_keys TEXT,
+    authors TEXT
+);
+CREATE TABLE IF NOT EXISTS authors (key TEXT PRIMARY KEY, name TEXT NOT NULL)
+    WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS isbns (isbn TEXT PRIMARY KEY, book_id INTEGER NOT NULL)
+    WITHOUT ROWID;
+CREATE VIRTUAL TABLE IF NOT EXISTS books_fts USING fts5(
+    title,
+    authors,
+    content='books',
+    content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+"""
+
+
+@dataclass(order=True, unsafe_hash=True, kw_only=True, slots=True)
+class CatalogEntry:
+    """A book in the local catalog."""
+
+    title: str
+    subtitle: str | None = None
+    year: int | None = None
+    authors: tuple[str, ...] = ()
+
+    @property
+    def stem_meta_data(self) -> StemMetaData:
+        """Get the stem metadata of the book."""
+        subtitles = () if self.subtitle is None else (self.subtitle,)
+        return StemMetaData(
+            year=cast("Any", self.year),
+            title_and_subtitles=(self.title, *subtitles),
+            authors=self.authors,
+        )
+
+
+@dataclass(kw_only=True)
+class Catalog:
+    """A local catalog of books, indexed by ISBN and by title and author tokens."""
+
+    path: Path = CATALOG_PATH
+    _conn: Connection = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = connect(self.path, check_same_thread=False)
+        _ = self._conn.executescript(_SCHEMA)
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+        /,
+    ) -> None:
+        self.close()
+
+    def candidates(self, text: str, /, *, limit: int = 10) -> list[CatalogEntry]:
+        """Get the ranked candidates for a file stem."""
+        if ((isbn := find_isbn(text)) is not None) and (
+            (entry := self.lookup_isbn(isbn)) is not None
+        ):
+            return [entry]
+        try:
+            stem = StemMetaData.from_text(text)
+        except StemMetaDataFromTextError:
+            return self.search(title=text, limit=limit)
+        return self.lookup(stem, limit=limit)
+
+    def close(self) -> None:
+        """Close the catalog."""
+        self._conn.close()
+
+    def import_dump(self, path: Path, /, *, batch_size: int = 10_000) -> int:
+        """Import a bibliographic dump, such as an Open Library dump."""
+        _ = self._conn.execute("PRAGMA journal_mode = WAL")
+        _ = self._conn.execute("PRAGMA synchronous = OFF")
+        count = 0
+        for batch in batched(_yield_records(path), batch_size):
+            with self._conn:
+                for record in batch:
+                    self._insert(record)
+            count += len(batch)
+            _LOGGER.info("Imported %d records", count)
+        with self._conn:
+            _ = self._conn.execute(
+                """
+                UPDATE books SET authors = (
+                    SELECT group_concat(a.name, ?)
+                    FROM json_each(books.author_keys) AS j
+                    JOIN authors AS a ON a.key = j.value
+                )
+                WHERE (authors IS NULL) AND (author_keys IS NOT NULL)
+                """,
+                (_SEP,),
+            )
+            _ = self._conn.execute("INSERT INTO books_fts(books_fts) VALUES('rebuild')")
+        return count
+
+    def lookup(self, stem: StemMetaData, /, *, limit: int = 10) -> list[CatalogEntry]:
+        """Get the ranked candidates for a set of stem metadata."""
+        match stem.authors:
+            case tuple() as authors:
+                authors = " ".join(authors)
+            case AuthorEtAl() as author_et_al:
+                authors = author_et_al.author
+        entries = self.search(
+            title=" ".join(stem.title_and_subtitles), authors=authors, limit=limit
+        )
+        if stem.year is None:
+            return entries
+        return [e for e in entries if e.year == stem.year] + [
+            e for e in entries if e.year != stem.year
+        ]
+
+    def lookup_isbn(self, isbn: str, /) -> CatalogEntry | None:
+        """Get a book by its ISBN."""
+        if (key := normalize_isbn(isbn)) is None:
+            return None
+        row = self._conn.execute(
+            """
+            SELECT id, title, subtitle, year, authors FROM books
+            WHERE id = (SELECT book_id FROM isbns WHERE isbn = ?)
+            """,
+            (key,),
+        ).fetchone()
+        return None if row is None else _to_entry(row)
+
+    def search(
+        self, *, title: str = "", authors: str = "", limit: int = 10
+    ) -> list[CatalogEntry]:
+        """Get the books matching a set of title and author tokens, best first."""
+        title_tokens, author_tokens = map(_tokenize, [title, authors])
+        if len(title_tokens) == len(author_tokens) == 0:
+            return []
+        for op in [" AND ", " OR "]:
+            query = op.join([
+                *(f"title:{t}" for t in title_tokens),
+                *(f"authors:{t}" for t in author_tokens),
+            ])
+            rows = self._conn.execute(
+                """
+                SELECT id, title, subtitle, year, authors FROM books
+                JOIN (
+                    SELECT rowid, bm25(books_fts, 10.0, 5.0) AS rank
+                    FROM books_fts WHERE books_fts MATCH ?
+                    ORDER BY rank LIMIT ?
+                ) AS m ON m.rowid = books.id
+                ORDER BY m.rank
+                """,
+                (query, limit),
+            ).fetchall()
+            if len(rows) >= 1:
+                return list(map(_to_entry, rows))
+        return []
+
+    def _insert(self, record: dict[str, Any], /) -> None:
+        key = record.get("key")
+        if record.get("type") in ({"key": "/type/author"}, "/type/author"):
+            if isinstance(name := record.get("name"), str) and (key is not None):
+                _ = self._conn.execute(
+                    "INSERT OR REPLACE INTO authors VALUES (?, ?)", (key, name)
+                )
+            return
+        if not isinstance(title := record.get("title"), str):
+            return
+        names, keys = _get_authors(record)
+        cursor = self._conn.execute(
+            """
+            INSERT INTO books (key, title, subtitle, year, author_keys, authors)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (key) DO UPDATE SET
+                title = excluded.title,
+                subtitle = excluded.subtitle,
+                year = excluded.year,
+                author_keys = excluded.author_keys,
+                authors = excluded.authors
+            RETURNING id
+            """,
+            (
+                key,
+                title,
+                record.get("subtitle"),
+                _get_year(record),
+                None if len(keys) == 0 else dumps(keys),
+                None if len(names) == 0 else _SEP.join(names),
+            ),
+        )
+        (book_id,) = cursor.fetchone()
+        isbns = {i for i in map(normalize_isbn, _get_isbns(record)) if i is not None}
+        _ = self._conn.executemany(
+            "INSERT OR REPLACE INTO isbns VALUES (?, ?)", [(i, book_id) for i in isbns]
+        )
+
+
+def find_isbn(text: str, /) -> str | None:
+    """Find an ISBN in a string, if it exists."""
+    if (
+        match := search(
+            r"(?<![\dX])(97[89][\d\-]{10,14}|\d[\d\-]{8,11}[\dX])(?![\dX])", text
+        )
+    ) is None:
+        return None
+    return normalize_isbn(match.group(1))
+
+
+def normalize_isbn(isbn: str, /) -> str | None:
+    """Normalize an ISBN to its 13-digit form, if it is valid."""
+    digits = sub(r"[\s\-]", "", isbn).upper()
+    if search(r"^\d{9}[\dX]$", digits):
+        if _isbn10_check(digits[:9]) != digits[9]:
+            return None
+        digits = f"978{digits[:9]}"
+        return f"{digits}{_isbn13_check(digits)}"
+    if search(r"^97[89]\d{10}$", digits) and (_isbn13_check(digits[:12]) == digits[12]):
+        return digits
+    return None
+
+
+def _isbn10_check(digits: str, /) -> str:
+    total = sum((10 - i) * int(d) for i, d in enumerate(digits))
+    check = (11 - total % 11) % 11
+    return "X" if check == 10 else str(check)
+
+
+def _isbn13_check(digits: str, /) -> str:
+    total = sum((3 if i % 2 else 1) * int(d) for i, d in enumerate(digits))
+    return str((10 - total % 10) % 10)
+
+
+def _get_authors(record: dict[str, Any], /) -> tuple[list[str], list[str]]:
+    names = [n for n in record.get("author_name", []) if isinstance(n, str)]
+    keys: list[str] = []
+    for author in record.get("authors", []):
+        match author:
+            case str() as name:
+                names.append(name)
+            case {"name": str() as name}:
+                names.append(name)
+            case {"key": str() as key} | {"author": {"key": str() as key}}:
+                keys.append(key)
+            case _:
+                pass
+    return names, keys
+
+
+def _get_isbns(record: dict[str, Any], /) -> Iterator[str]:
+    for key in ["isbn", "isbn_10", "isbn_13"]:
+        match record.get(key):
+            case str() as isbn:
+                yield isbn
+            case list() as isbns:
+                yield from (i for i in isbns if isinstance(i, str))
+            case _:
+                pass
+
+
+def _get_year(record: dict[str, Any], /) -> int | None:
+    for key in ["publish_date", "first_publish_date", "first_publish_year"]:
+        if ((value := record.get(key)) is not None) and (
+            (match := search(r"\b(\d{4})\b", str(value))) is not None
+        ):
+            return int(match.group(1))
+    return None
+
+
+def _to_entry(row: tuple[Any, ...], /) -> CatalogEntry:
+    _, title, subtitle, year, authors = row
+    return CatalogEntry(
+        title=title,
+        subtitle=subtitle,
+        year=year,
+        authors=() if authors is None else tuple(authors.split(_SEP)),
+    )
+
+
+def _tokenize(text: str, /) -> list[str]:
+    return [f'"{t}"' for t in findall(r"\w+", text.casefold())]
+
+
+def _yield_lines(path: Path, /) -> Iterator[str]:
+    if path.suffix == ".gz":
+        with gzip_open(path, mode="rt", encoding="utf-8") as fh:
+            yield from fh
+    else:
+        with path.open(encoding="utf-8") as fh:
+            yield from fh
+
+
+def _yield_records(path: Path, /) -> Iterator[dict[str, Any]]:
+    for line in _yield_lines(path):
+        *_, text = line.rstrip("\n").split("\t")
+        try:
+            record = loads(text)
+        except JSONDecodeError:
+            _LOGGER.warning("Skipping invalid line %r", line[:100])
+            continue
+        if isinstance(record, dict):
+            yield record
+
+
+__all__ = ["CATALOG_PATH", "Catalog", "CatalogEntry", "find_isbn", "normalize_isbn"]
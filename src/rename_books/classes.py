@@ -2,13 +2,17 @@ from __future__ import annotations
 
 from contextlib import suppress
 from dataclasses import dataclass, field
+from functools import lru_cache
 from itertools import chain, takewhile
 from logging import getLogger
 from pathlib import Path
 from re import search, split, sub
+from time import perf_counter
 from typing import TYPE_CHECKING, Any, Literal, Self, cast
 
+from pathvalidate import is_valid_filename
 from prompt_toolkit import prompt
+from prompt_toolkit.application import get_app
 from prompt_toolkit.completion import WordCompleter
 from prompt_toolkit.validation import Validator
 from tabulate import tabulate
@@ -24,6 +28,10 @@ from utilities.core import (
 from utilities.errors import ImpossibleCaseError
 from utilities.pathlib import ensure_suffix
 
+from rename_books.aliases import get_aliases
+from rename_books.filesystem import LOCAL_FILESYSTEM
+from rename_books.formats import detect_format
+from rename_books.tracing import span
 from rename_books.utilities import (
     clean_text,
     is_empty_or_is_valid_filename,
@@ -31,10 +39,14 @@ from rename_books.utilities import (
 )
 
 if TYPE_CHECKING:
-    from collections.abc import Iterable, Iterator
+    from collections.abc import Callable, Iterable, Iterator, Sequence
+
+    from rename_books.filesystem import FileSystem
 
 
 _LOGGER = getLogger(__name__)
+_Z_LIBRARY = " (Z-Library)"
+SLOW_PARSE_DURATION = 0.01
 
 
 @dataclass(order=True, unsafe_hash=True, kw_only=True)
@@ -48,10 +60,13 @@ class MetaData[Year: (int, None), Suffix: (str, None)]:
     suffix: Suffix = cast("Suffix", None)
 
     @classmethod
-    def from_path(cls, path: Path, /) -> MetaData[Any, Any]:
-        """Construct a set of metadata from a Path."""
+    def from_path(
+        cls, path: Path, /, *, suffix: str | None = None
+    ) -> MetaData[Any, Any]:
+        """Construct a set of metadata from a Path, correcting its suffix."""
         try:
-            stem = StemMetaData.from_text(path.stem)
+            with span("from_path"):
+                stem = StemMetaData.from_text(path.stem)
         except StemMetaDataFromTextError as error:
             raise MetaDataFromPathError(*[f"{path=}"]) from error
         return cls(
@@ -59,14 +74,14 @@ class MetaData[Year: (int, None), Suffix: (str, None)]:
             year=stem.year,
             title_and_subtitles=stem.title_and_subtitles,
             authors=stem.authors,
-            suffix=cast("Suffix", path.suffix),
+            suffix=cast("Suffix", path.suffix if suffix is None else suffix),
         )
 
     @classmethod
-    def is_normalized(cls, path: Path, /) -> bool:
+    def is_normalized(cls, path: Path, /, *, suffix: str | None = None) -> bool:
         """Check if a path is normalized."""
         try:
-            return cls.from_path(path).to_path == path
+            return cls.from_path(path, suffix=suffix).to_path == path
         except (MetaDataFromPathError, MetaDataWithAllMetaDataError):
             return False
 
@@ -77,42 +92,90 @@ class MetaData[Year: (int, None), Suffix: (str, None)]:
         return ensure_suffix(Path(self.directory, meta.stem), meta.suffix).name
 
     @classmethod
-    def normalize(cls, path: Path, /) -> Path:
+    def normalize(cls, path: Path, /, *, suffix: str | None = None) -> Path:
         """Normalize a Path."""
-        return cls.from_path(path).to_path
+        return cls.from_path(path, suffix=suffix).to_path
 
     @classmethod
-    def process(cls, path: Path, /) -> None:
-        """Process a path."""
-        meta = cls.from_path(path)
+    def process(
+        cls,
+        path: Path,
+        /,
+        *,
+        candidates: Sequence[StemMetaData] = (),
+        on_rename: Callable[[Path, Path], None] | None = None,
+        filesystem: FileSystem = LOCAL_FILESYSTEM,
+    ) -> None:
+        """Process a path, calling `on_rename` after renaming it."""
+        meta = cls.from_path(path, suffix=detect_format(path, filesystem=filesystem))
+        preview = NamePreview(meta=meta, source=path, filesystem=filesystem)
         while True:
-            match meta.process_choice():
+            preview.meta = meta
+            match meta.process_choice(candidates=candidates):
                 case True:
                     target = meta.to_path
                     _LOGGER.info("Renaming\n    %r\n--> %r", str(path), str(target))
-                    _ = path.rename(target)
+                    with span("rename"):
+                        filesystem.rename(path, target)
+                    if on_rename is not None:
+                        on_rename(path, target)
                     return
                 case "year":
-                    meta = meta.process_year()
+                    meta = meta.process_year(preview=preview)
                 case "title/subtitles":
                     meta = meta.process_title_and_subtitles_or_authors(
-                        "title/subtitles"
+                        "title/subtitles", preview=preview
                     )
                 case "authors":
-                    meta = meta.process_title_and_subtitles_or_authors("authors")
+                    meta = meta.process_title_and_subtitles_or_authors(
+                        "authors", preview=preview
+                    )
+                case "catalog":
+                    meta = meta.process_catalog(candidates)
+
+    def process_catalog(self, candidates: Sequence[StemMetaData], /) -> Self:
+        """Process the metadata using a catalog candidate."""
+        with span("prompt", kind="catalog"):
+            index = prompt(
+                f"{repr_candidates(candidates)}\nInput candidate: ",
+                default="0",
+                mouse_support=True,
+                validator=Validator.from_callable(
+                    lambda text: (
+                        bool(search(r"^(\d+)$", text)) and (int(text) < len(candidates))
+                    ),
+                    error_message="Enter a valid candidate",
+                ),
+                vi_mode=True,
+            ).strip()
+        candidate = candidates[int(index)]
+        return self.replace(
+            year=self.year if candidate.year is None else candidate.year,
+            title_and_subtitles=candidate.title_and_subtitles,
+            authors=self.authors if candidate.authors == () else candidate.authors,
+        )
 
-    def process_choice(self) -> Literal[True, "year", "title/subtitles", "authors"]:
+    def process_choice(
+        self, *, candidates: Sequence[StemMetaData] = ()
+    ) -> Literal[True, "year", "title/subtitles", "authors", "catalog"]:
         """Check if a set of metadata is ready or needs modification."""
-        result = prompt(
-            f"{self.repr_table}\nConfirm? []yes, [y]ear, [t]itle/subtitles, [a]uthors: ",
-            completer=WordCompleter(["y", "e", "t", "a"]),
-            mouse_support=True,
-            validator=Validator.from_callable(
-                lambda text: bool(search(r"^(|y|t|a)$", text)),
-                error_message="Enter '', 'y', 't' or 'a'",
-            ),
-            vi_mode=True,
-        ).strip()
+        if len(candidates) == 0:
+            message = f"{self.repr_table}\nConfirm? []yes, [y]ear, [t]itle/subtitles, [a]uthors: "
+            pattern, choices = r"^(|y|t|a)$", "'', 'y', 't' or 'a'"
+        else:
+            message = f"{self.repr_table}\n{repr_candidates(candidates)}\nConfirm? []yes, [y]ear, [t]itle/subtitles, [a]uthors, [c]atalog: "
+            pattern, choices = r"^(|y|t|a|c)$", "'', 'y', 't', 'a' or 'c'"
+        with span("prompt", kind="choice"):
+            result = prompt(
+                message,
+                completer=WordCompleter(["y", "e", "t", "a", "c"]),
+                mouse_support=True,
+                validator=Validator.from_callable(
+                    lambda text: bool(search(pattern, text)),
+                    error_message=f"Enter {choices}",
+                ),
+                vi_mode=True,
+            ).strip()
         match result:
             case "":
                 return True
@@ -122,27 +185,39 @@ class MetaData[Year: (int, None), Suffix: (str, None)]:
                 return "title/subtitles"
             case "a":
                 return "authors"
+            case "c":
+                return "catalog"
             case _:
                 raise ImpossibleCaseError(case=[f"{result=}"])
 
-    def process_year(self) -> Self:
-        """Process the year on a set of metadata."""
-        year = prompt(
-            "Input year: ",
-            default="20" if self.year is None else str(self.year),
-            mouse_support=True,
-            validator=Validator.from_callable(
-                lambda text: bool(search(r"^(\d+)$", text)),
-                error_message="Enter a valid year",
-            ),
-            vi_mode=True,
-        ).strip()
+    def process_year(self, *, preview: NamePreview | None = None) -> Self:
+        """Process the year on a set of metadata, previewing the name as typed."""
+        preview = NamePreview(meta=self) if preview is None else preview
+        with span("prompt", kind="year"):
+            year = prompt(
+                "Input year: ",
+                bottom_toolbar=lambda: preview.render(
+                    year=_parse_year(get_app().current_buffer.text)
+                ),
+                default="20" if self.year is None else str(self.year),
+                mouse_support=True,
+                validator=Validator.from_callable(
+                    lambda text: bool(search(r"^(\d+)$", text)),
+                    error_message="Enter a valid year",
+                ),
+                vi_mode=True,
+            ).strip()
         return self.replace(year=int(year))
 
     def process_title_and_subtitles_or_authors(
-        self, type_: Literal["title/subtitles", "authors"], /
+        self,
+        type_: Literal["title/subtitles", "authors"],
+        /,
+        *,
+        preview: NamePreview | None = None,
     ) -> Self:
-        """Process the title/subtitles or authors on a set of metadata."""
+        """Process the title/subtitles or authors, previewing the name as typed."""
+        preview = NamePreview(meta=self) if preview is None else preview
         match type_:
             case "title/subtitles":
                 default = self.title_and_subtitles
@@ -155,19 +230,33 @@ class MetaData[Year: (int, None), Suffix: (str, None)]:
             case AuthorEtAl() as author_et_al:
                 default_use = (author_et_al.author,)
 
+        results: list[str] = []
+
+        def render() -> str:
+            current = get_app().current_buffer.text.strip()
+            parts = [*results, current] if is_non_empty(current) else results
+            match type_:
+                case "title/subtitles":
+                    return preview.render(title_and_subtitles=parts)
+                case "authors":
+                    return preview.render(authors=parts)
+
         def yield_inputs() -> Iterator[str]:
             n: int = 0
             while True:
-                result = prompt(
-                    f"Input {type_}: ",
-                    default=clean_text(" ".join(default_use[n:])),
-                    mouse_support=True,
-                    validator=Validator.from_callable(
-                        is_empty_or_is_valid_filename,
-                        error_message="Enter the empty string, or a valid file name",
-                    ),
-                    vi_mode=True,
-                ).strip()
+                with span("prompt", kind=type_):
+                    result = prompt(
+                        f"Input {type_}: ",
+                        bottom_toolbar=render,
+                        default=clean_text(" ".join(default_use[n:])),
+                        mouse_support=True,
+                        validator=Validator.from_callable(
+                            is_empty_or_is_valid_filename,
+                            error_message="Enter the empty string, or a valid file name",
+                        ),
+                        vi_mode=True,
+                    ).strip()
+                results.append(result)
                 yield result
                 n += len(result.split(" "))
 
@@ -184,7 +273,7 @@ class MetaData[Year: (int, None), Suffix: (str, None)]:
         directory: Path | Sentinel = sentinel,
         year: int | None | Sentinel = sentinel,
         title_and_subtitles: Iterable[str] | Sentinel = sentinel,
-        authors: Iterable[str] | Sentinel = sentinel,
+        authors: Iterable[str] | AuthorEtAl | Sentinel = sentinel,
         suffix: str | None | Sentinel = sentinel,
     ) -> Self:
         return replace_non_sentinel(
@@ -194,14 +283,17 @@ class MetaData[Year: (int, None), Suffix: (str, None)]:
             title_and_subtitles=sentinel
             if isinstance(title_and_subtitles, Sentinel)
             else tuple(title_and_subtitles),
-            authors=sentinel if isinstance(authors, Sentinel) else tuple(authors),
+            authors=authors
+            if isinstance(authors, Sentinel | AuthorEtAl)
+            else tuple(authors),
             suffix=suffix,
         )
 
     @property
     def repr_table(self) -> str:
         """The metadata as a table."""
-        return tabulate(list(self.yield_repr_table_parts()))
+        with span("repr_table"):
+            return tabulate(list(self.yield_repr_table_parts()))
 
     @property
     def stem(self) -> str:
@@ -267,6 +359,101 @@ class MetaDataWithAllMetaDataError(Exception): ...
 ##
 
 
+@dataclass(kw_only=True)
+class NamePreview:
+    """A live preview of the name rendered from a set of metadata being edited.
+
+    Rendering bypasses `StemMetaData`, and fields are cleaned through a memo,
+    so unchanged fields are not re-titlecased on each keystroke.
+    """
+
+    meta: MetaData[Any, Any]
+    source: Path | None = None
+    filesystem: FileSystem = LOCAL_FILESYSTEM
+    _exists: dict[Path, bool] = field(default_factory=dict, init=False, repr=False)
+
+    def render(
+        self,
+        *,
+        year: int | Sentinel | None = sentinel,
+        title_and_subtitles: Iterable[str] | Sentinel = sentinel,
+        authors: Iterable[str] | Sentinel = sentinel,
+    ) -> str:
+        """Render the name and its status, overriding the fields being edited."""
+        year_use = self.meta.year if isinstance(year, Sentinel) else year
+        titles = tuple(
+            map(
+                _clean_text,
+                self.meta.title_and_subtitles
+                if isinstance(title_and_subtitles, Sentinel)
+                else title_and_subtitles,
+            )
+        )
+        author = _render_author(
+            self.meta.authors if isinstance(authors, Sentinel) else tuple(authors)
+        )
+        if (
+            (year_use is None)
+            or (len(titles) == 0)
+            or (author is None)
+            or (self.meta.suffix is None)
+        ):
+            return "Preview: incomplete"
+        stem = _render_stem(year_use, titles, author)
+        name = ensure_suffix(Path(self.meta.directory, stem), self.meta.suffix).name
+        if not is_valid_filename(name):
+            status = "invalid"
+        elif self._target_exists(self.meta.directory.joinpath(name)):
+            status = "exists"
+        else:
+            status = "ok"
+        return f"Preview: {name} [{status}]"
+
+    def _target_exists(self, path: Path, /) -> bool:
+        if path == self.source:
+            return False
+        try:
+            return self._exists[path]
+        except KeyError:
+            exists = self._exists[path] = self.filesystem.exists(path)
+            return exists
+
+
+@lru_cache(maxsize=4_096)
+def _clean_text(text: str, /) -> str:
+    return clean_text(text)
+
+
+def _parse_year(text: str, /) -> int | None:
+    text = text.strip()
+    return int(text) if search(r"^(\d+)$", text) else None
+
+
+def _render_author(authors: tuple[str, ...] | AuthorEtAl, /) -> str | None:
+    match authors:
+        case AuthorEtAl():
+            return authors.to_string
+        case ():
+            return None
+        case (author,):
+            return _clean_text(author)
+        case _:
+            return f"{_clean_text(authors[0])} et al"
+
+
+def _render_stem(
+    year: int, title_and_subtitles: Sequence[str], author: str | None, /
+) -> str:
+    name = f"{year} — {title_and_subtitles[0]}"
+    if len(subtitles := title_and_subtitles[1:]) >= 1:
+        joined = " – ".join(subtitles)
+        name = f"{name} – {joined}"
+    return name if author is None else f"{name} ({author})"
+
+
+##
+
+
 @dataclass(order=True, unsafe_hash=True, kw_only=True)
 class StemMetaData[Year: (int, None)]:
     """A set of stem metadata."""
@@ -297,55 +484,69 @@ class StemMetaData[Year: (int, None)]:
 
     @classmethod
     def from_text(cls, stem: str, /) -> Self:
-        """Construct a set of metadata from a string."""
-        with suppress(ExtractGroupError):
-            pre = extract_group(r"^(.+) \(Z-Library\)$", stem)
-            return cls.from_text(pre)
-        with suppress(ExtractGroupsError):
+        """Construct a set of metadata from a string.
+
+        The patterns are free of nested ambiguity, so parsing takes time linear
+        in the length of the stem; slow parses are logged nonetheless. A pattern
+        matching without a title falls through to the next.
+        """
+        start = perf_counter()
+        try:
+            return cls._from_text(stem)
+        finally:
+            if (duration := perf_counter() - start) >= SLOW_PARSE_DURATION:
+                _LOGGER.warning("Parsing %r took %.3fs", stem, duration)
+
+    @classmethod
+    def _from_text(cls, stem: str, /) -> Self:
+        while (len(stem) > len(_Z_LIBRARY)) and stem.endswith(_Z_LIBRARY):
+            stem = stem.removesuffix(_Z_LIBRARY)
+        with suppress(ExtractGroupsError, StemMetaDataFromTextError):
             year, title_and_subtitles, authors = extract_groups(
-                r"^(\d+)[\s\-\—]+(.+?)[\s\-\—]?(?:\(([\s\w\-\,\'èï]+)\))?$", stem
+                r"^(\d++)[\s\-\—]++(.+?)[\s\-\—]?(?:\(([\s\w\-\,\.\'èï]++)\))?$", stem
             )
             return cls(
                 year=cast("Year", int(year)),
                 title_and_subtitles=cls._parse_title_and_subtitles(title_and_subtitles),
                 authors=cls._parse_authors(authors),
             )
-        with suppress(ExtractGroupsError):
+        with suppress(ExtractGroupsError, StemMetaDataFromTextError):
             year, title_and_subtitles, authors = extract_groups(
-                r"^\((\d+)\)[\s\-\—]+(.+)[\s\-\—]+\(([\s\w\,]+)\)?$", stem
+                r"^\((\d++)\)[\s\-\—]++(.+)[\s\-\—]\(([\s\w\,]++)\)?$", stem
             )
             return cls(
                 year=cast("Year", int(year)),
                 title_and_subtitles=cls._parse_title_and_subtitles(title_and_subtitles),
                 authors=cls._parse_authors(authors),
             )
-        with suppress(ExtractGroupsError):
-            authors, title_and_subtitles, year = extract_groups(
-                r"^([\w\s\-\.\,]+)\s+\-\s+(.+?)\s+\((\d+)\)$", stem
+        with suppress(ExtractGroupsError, StemMetaDataFromTextError):
+            head, year = extract_groups(r"^(.*\S)\s++\((\d++)\)$", stem)
+            authors, title_and_subtitles = extract_groups(
+                r"^([\w\s\-\.\,]+)\s\-\s++(.+)$", head
             )
             return cls(
                 year=cast("Year", int(year)),
                 title_and_subtitles=cls._parse_title_and_subtitles(title_and_subtitles),
                 authors=cls._parse_authors(authors),
             )
-        with suppress(ExtractGroupsError):
+        with suppress(ExtractGroupsError, StemMetaDataFromTextError):
             year, title_and_subtitles, authors = extract_groups(
-                r"^\((\d+)\) ([\w\s\-\.\,]+)\.?\(([\w\s\[\]\.\,]+)\)$", stem
+                r"^\((\d++)\) ([\w\s\-\.\,]+)\.?\(([\w\s\[\]\.\,]++)\)$", stem
             )
             return cls(
                 year=cast("Year", int(year)),
                 title_and_subtitles=cls._parse_title_and_subtitles(title_and_subtitles),
                 authors=cls._parse_authors(authors),
             )
-        with suppress(ExtractGroupsError):
+        with suppress(ExtractGroupsError, StemMetaDataFromTextError):
             title_and_subtitles, authors = extract_groups(
-                r"^\(—\) ([\w\s\-\.\,]+)\.?\(([\w\s]+)\)$", stem
+                r"^\(—\) ([\w\s\-\.\,]+)\.?\(([\w\s]++)\)$", stem
             )
             return cls(
                 title_and_subtitles=cls._parse_title_and_subtitles(title_and_subtitles),
                 authors=cls._parse_authors(authors),
             )
-        with suppress(ExtractGroupsError):
+        with suppress(ExtractGroupsError, StemMetaDataFromTextError):
             first, second = extract_groups(r"^(.+?)\-(.+)$", stem)
             lfirst, lsecond = map(len, [first, second])
             if max(lfirst, lsecond) <= 20:
@@ -358,8 +559,8 @@ class StemMetaData[Year: (int, None)]:
                 title_and_subtitles=cls._parse_title_and_subtitles(title_and_subtitles),
                 authors=cls._parse_authors(authors),
             )
-        with suppress(ExtractGroupsError):
-            first, second = extract_groups(r"^(.+?)\s*\-\s*(.+)$", stem)
+        with suppress(ExtractGroupsError, StemMetaDataFromTextError):
+            first, second = extract_groups(r"^(.*?\S)\s*\-\s*(.+)$", stem)
             if len(first) <= len(second):
                 authors, title_and_subtitles = first, second
             else:
@@ -403,7 +604,8 @@ class StemMetaData[Year: (int, None)]:
     @property
     def repr_table(self) -> str:
         """The metadata as a table."""
-        return tabulate(list(self.yield_repr_table_parts()))
+        with span("repr_table"):
+            return tabulate(list(self.yield_repr_table_parts()))
 
     @property
     def subtitles(self) -> tuple[str, ...]:
@@ -423,17 +625,12 @@ class StemMetaData[Year: (int, None)]:
     def to_text(self) -> str:
         """Construct a string from the metadata."""
         meta = self.with_all_metadata
-        name = f"{meta.year} — {meta.title}"
-        if len(subtitles := meta.subtitles) >= 1:
-            joined = " – ".join(subtitles)
-            name = f"{name} – {joined}"
-        match meta.author_use:
-            case None:
-                return name
-            case str() as author:
-                return f"{name} ({author})"
-            case AuthorEtAl() as authors:
-                return f"{name} ({authors.to_string})"
+        author = meta.author_use
+        return _render_stem(
+            meta.year,
+            meta.title_and_subtitles,
+            author.to_string if isinstance(author, AuthorEtAl) else author,
+        )
 
     @property
     def with_all_metadata(self) -> StemMetaData[int]:
@@ -468,19 +665,24 @@ class StemMetaData[Year: (int, None)]:
             return ()
         with suppress(AuthorEtAlFromStringError):
             return AuthorEtAl.from_string(text)
-        return tuple(map(cls._strip_text, split(r",", text)))
+        aliases = get_aliases()
+        if (canonical := aliases.get_inverted(text)) is not None:
+            return (canonical,)
+        return tuple(
+            aliases.canonicalize(cls._strip_text(a)) for a in split(r",", text)
+        )
 
     @classmethod
     def _parse_title_and_subtitles(cls, text: str, /) -> tuple[str, ...]:
         text = cls._strip_text(text)
         if not text:
-            raise ImpossibleCaseError(case=[f"{text=}"])
+            raise StemMetaDataFromTextError(*[f"{text=}"])
         splits = tuple(map(cls._strip_text, split(r"–|—| - ", text)))
         return tuple(s for s in splits if len(s) >= 1)
 
     @classmethod
     def _strip_text(cls, text: str, /) -> str:
-        return sub(r"^[\s\-\—]+|[\s\-\—]+$", "", text)
+        return sub(r"^[\s\-\—]++|(?<![\s\-\—])[\s\-\—]++$", "", text)
 
 
 class StemMetaDataFromTextError(Exception): ...
@@ -508,10 +710,10 @@ class AuthorEtAl:
     def from_string(cls, text: str, /) -> Self:
         """Construct a set of metadata from a string."""
         try:
-            author = extract_group(r"^([\w\s\-]+) et al$", text)
+            author = extract_group(r"^([\w\s\-\.\']+) et al\.?$", text)
         except ExtractGroupError as error:
             raise AuthorEtAlFromStringError(*[f"{text=}"]) from error
-        return cls(author=author)
+        return cls(author=get_aliases().canonicalize(author))
 
     @property
     def to_string(self) -> str:
@@ -522,4 +724,26 @@ class AuthorEtAl:
 class AuthorEtAlFromStringError(Exception): ...
 
 
-__all__ = ["AuthorEtAl", "MetaData", "StemMetaData"]
+##
+
+
+def repr_candidates(candidates: Iterable[StemMetaData], /) -> str:
+    """A set of candidate stem metadata as a table."""
+    return tabulate(
+        [
+            (i, c.year, " – ".join(c.title_and_subtitles), _repr_authors(c.authors))
+            for i, c in enumerate(candidates)
+        ],
+        headers=["#", "year", "title/subtitles", "authors"],
+    )
+
+
+def _repr_authors(authors: tuple[str, ...] | AuthorEtAl, /) -> str:
+    match authors:
+        case tuple():
+            return ", ".join(authors)
+        case AuthorEtAl():
+            return authors.to_string
+
+
+__all__ = ["AuthorEtAl", "MetaData", "NamePreview", "StemMetaData", "repr_candidates"]
@@ -1,29 +1,355 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack, suppress
+from logging import getLogger
+from pathlib import Path
+from sys import stdout
+from typing import TextIO
 
-from click import command, version_option
+from click import (
+    Context,
+    File,
+    argument,
+    echo,
+    group,
+    option,
+    pass_context,
+    version_option,
+)
 from utilities.click import CONTEXT_SETTINGS
 from utilities.core import set_up_logging
 
 from rename_books import __version__
-from rename_books.classes import MetaData
-from rename_books.lib import get_decision, get_next_file
+from rename_books.aliases import ALIASES_PATH, AliasStore
+from rename_books.benchmark import DEFAULT_SIZES, run_benchmark, write_benchmark
+from rename_books.cache import CACHE_PATH, ContentCache
+from rename_books.catalog import CATALOG_PATH, Catalog
+from rename_books.classes import MetaData, repr_candidates
+from rename_books.constants import BOOKS
+from rename_books.export import SNAPSHOT_PATH, export_library
+from rename_books.leases import LeaseLostError, claim_next_file, yield_renewing
+from rename_books.lib import get_decision, yield_authors
+from rename_books.migrate import (
+    CHECKPOINT_PATH,
+    apply_plan,
+    compute_renames,
+    load_plan,
+    plan_renames,
+)
+from rename_books.search import SEARCH_PATH, SearchIndex, repr_search_hits
+from rename_books.server import DEFAULT_HOST, DEFAULT_PORT, serve
+from rename_books.session import SESSION_PATH, SessionState
+from rename_books.stream import DEFAULT_CHUNK_SIZE, normalize_lines
+from rename_books.tracing import (
+    TRACE_ENV_VAR,
+    enable_tracing,
+    read_trace,
+    repr_trace_summary,
+    span,
+    summarize_trace,
+)
 
-if TYPE_CHECKING:
-    from pathlib import Path
+_LOGGER = getLogger(__name__)
 
 
-@command(**CONTEXT_SETTINGS)
+@group(**CONTEXT_SETTINGS, invoke_without_command=True)
 @version_option(version=__version__)
-def main() -> None:
+@option(
+    "--session",
+    type=Path,
+    default=SESSION_PATH,
+    help="Path to the session state used to resume the inbox loop",
+)
+@option("--reset", is_flag=True, help="Forget skipped files and the queue position")
+@option(
+    "--settle",
+    type=float,
+    default=0.0,
+    help="Seconds to wait for other machines' leases to sync before processing",
+)
+@option(
+    "--trace",
+    type=Path,
+    default=None,
+    envvar=TRACE_ENV_VAR,
+    help="Path to append JSON-lines timing spans to",
+)
+@pass_context
+def main(
+    ctx: Context, /, *, session: Path, reset: bool, settle: float, trace: Path | None
+) -> None:
     set_up_logging(__name__, root=True)
-    skips: set[Path] = set()
-    while (path := get_next_file(skips=skips)) is not None:
-        if get_decision(path):
-            MetaData.process(path)
-        else:
-            skips.add(path)
+    if trace is not None:
+        enable_tracing(trace)
+    if ctx.invoked_subcommand is None:
+        state = SessionState.load(session)
+        if reset:
+            state.reset()
+        _process_inbox(state, settle=settle)
+
+
+def _process_inbox(state: SessionState, /, *, settle: float = 0.0) -> None:
+    with ExitStack() as stack:
+        catalog = (
+            stack.enter_context(Catalog(path=CATALOG_PATH))
+            if CATALOG_PATH.exists()
+            else None
+        )
+        cache = stack.enter_context(ContentCache(path=CACHE_PATH))
+        with span("session"):
+            while (
+                lease := claim_next_file(
+                    skips=state, start=state.position, settle=settle, cache=cache
+                )
+            ) is not None:
+                with (
+                    suppress(LeaseLostError),
+                    yield_renewing(lease),
+                    span("file", name=lease.path.name),
+                ):
+                    path = lease.path
+                    state.set_position(path)
+                    if get_decision(path):
+                        with span("catalog"):
+                            candidates = (
+                                ()
+                                if catalog is None
+                                else [
+                                    e.stem_meta_data
+                                    for e in catalog.candidates(path.stem)
+                                ]
+                            )
+                        MetaData.process(path, candidates=candidates)
+                    else:
+                        state.add_skip(path)
+        _LOGGER.info(
+            "Format cache hit rate %.0f%% (%d hits, %d misses)",
+            100 * cache.hit_rate,
+            cache.hits,
+            cache.misses,
+        )
+
+
+@main.command(**CONTEXT_SETTINGS)
+@option(
+    "--size",
+    "sizes",
+    type=int,
+    multiple=True,
+    default=DEFAULT_SIZES,
+    help="Number of files in each synthetic inbox",
+)
+@option(
+    "--drain-limit",
+    type=int,
+    default=10,
+    help="Number of files to drain from each inbox",
+)
+@option("--repeats", type=int, default=3, help="Number of timing repeats")
+@option("--memory", is_flag=True, help="Hold the inboxes in memory, not on disk")
+@option(
+    "--output",
+    type=Path,
+    default=Path("benchmark.json"),
+    help="Path to write the scaling curve to",
+)
+def benchmark(
+    *,
+    sizes: tuple[int, ...],
+    drain_limit: int,
+    repeats: int,
+    memory: bool,
+    output: Path,
+) -> None:
+    """Benchmark the inbox loop against synthetic inboxes."""
+    results = run_benchmark(
+        sizes=sizes, drain_limit=drain_limit, repeats=repeats, memory=memory
+    )
+    write_benchmark(output, results)
+
+
+@main.command(name="export", **CONTEXT_SETTINGS)
+@option("--path", type=Path, default=BOOKS, help="Root of the library to export")
+@option(
+    "--output",
+    type=Path,
+    default=SNAPSHOT_PATH,
+    help="Directory of the snapshot, which is updated incrementally",
+)
+def export(*, path: Path, output: Path) -> None:
+    """Export a columnar snapshot of the parsed metadata of a library."""
+    snapshot, parsed = export_library(path, directory=output)
+    echo(f"Exported {len(snapshot)} files ({parsed} parsed)")
+
+
+@main.command(**CONTEXT_SETTINGS)
+@option("--path", type=Path, default=BOOKS, help="Root of the library to migrate")
+@option("--dry-run", is_flag=True, help="Show the plan without applying it")
+@option(
+    "--checkpoint",
+    type=Path,
+    default=CHECKPOINT_PATH,
+    help="Path to the checkpoint used to resume an interrupted migration",
+)
+@option("--workers", type=int, default=None, help="Number of worker processes")
+def migrate(
+    *, path: Path, dry_run: bool, checkpoint: Path, workers: int | None
+) -> None:
+    """Rename the whole library to the canonical name format."""
+    if (plan := load_plan(checkpoint, root=path)) is None:
+        plan = plan_renames(compute_renames(path, max_workers=workers), root=path)
+    if dry_run:
+        for line in plan.yield_lines():
+            echo(line)
+        return
+    apply_plan(plan, checkpoint=checkpoint, max_workers=workers)
+
+
+@main.command(**CONTEXT_SETTINGS)
+@argument("input_", metavar="INPUT", type=File())
+@option("--workers", type=int, default=None, help="Number of worker processes")
+@option(
+    "--chunk-size",
+    type=int,
+    default=DEFAULT_CHUNK_SIZE,
+    help="Lines per chunk sent to a worker",
+)
+def normalize(*, input_: TextIO, workers: int | None, chunk_size: int) -> None:
+    """Normalize stems or paths, one per line, writing TSV to stdout.
+
+    Use '-' to read from stdin; each row is the original, the normalized name
+    and a status of 'normalized', 'changed' or 'error'.
+    """
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        _ = stdout.writelines(
+            normalize_lines(input_, executor=executor, chunk_size=chunk_size)
+        )
+
+
+@main.command(name="trace-summary", **CONTEXT_SETTINGS)
+@argument("path", type=Path)
+def trace_summary(*, path: Path) -> None:
+    """Summarize the per-stage timings in a trace file, in milliseconds."""
+    echo(repr_trace_summary(summarize_trace(read_trace(path))))
+
+
+@main.group(**CONTEXT_SETTINGS)
+def aliases() -> None:
+    """Manage the aliases used to canonicalize author names."""
+
+
+@aliases.command(name="build", **CONTEXT_SETTINGS)
+@option("--path", type=Path, default=BOOKS, help="Root of the library to scan")
+@option("--aliases", "aliases_path", type=Path, default=ALIASES_PATH)
+def aliases_build(*, path: Path, aliases_path: Path) -> None:
+    """Add the spellings of every author in a library to the aliases."""
+    store = AliasStore.load(aliases_path)
+    store.add(yield_authors(path))
+    store.save()
+    echo(f"Saved {len(store)} authors")
+
+
+@aliases.command(name="merge", **CONTEXT_SETTINGS)
+@argument("canonical")
+@argument("names", nargs=-1, required=True)
+@option("--aliases", "aliases_path", type=Path, default=ALIASES_PATH)
+def aliases_merge(
+    *, canonical: str, names: tuple[str, ...], aliases_path: Path
+) -> None:
+    """Merge a set of author names under a canonical name."""
+    store = AliasStore.load(aliases_path)
+    store.merge(canonical, *names)
+    store.save()
+
+
+@main.group(**CONTEXT_SETTINGS)
+def catalog() -> None:
+    """Manage the local catalog of books."""
+
+
+@catalog.command(name="import", **CONTEXT_SETTINGS)
+@argument("path", type=Path)
+@option("--catalog", "catalog_path", type=Path, default=CATALOG_PATH)
+@option("--batch-size", type=int, default=10_000, help="Records per transaction")
+def catalog_import(*, path: Path, catalog_path: Path, batch_size: int) -> None:
+    """Import a bibliographic dump, such as an Open Library dump."""
+    with Catalog(path=catalog_path) as cat:
+        count = cat.import_dump(path, batch_size=batch_size)
+    echo(f"Imported {count} records")
+
+
+@catalog.command(name="lookup", **CONTEXT_SETTINGS)
+@argument("text")
+@option("--catalog", "catalog_path", type=Path, default=CATALOG_PATH)
+@option("--limit", type=int, default=10, help="Maximum number of candidates")
+def catalog_lookup(*, text: str, catalog_path: Path, limit: int) -> None:
+    """Look up the candidates for a file stem or ISBN."""
+    with Catalog(path=catalog_path) as cat:
+        entries = cat.candidates(text, limit=limit)
+    echo(repr_candidates(e.stem_meta_data for e in entries))
+
+
+@main.command(name="search", **CONTEXT_SETTINGS)
+@argument("query", default="")
+@option("--from-year", type=int, default=None, help="Earliest year to match")
+@option("--to-year", type=int, default=None, help="Latest year to match")
+@option("--limit", type=int, default=20, help="Maximum number of results")
+@option("--fuzzy/--no-fuzzy", default=True, help="Match near misses of each token")
+@option(
+    "--sync",
+    is_flag=True,
+    help="Bring the index up to date with BOOKS first; needed after filing books",
+)
+@option("--index", "index_path", type=Path, default=SEARCH_PATH)
+def search_(
+    *,
+    query: str,
+    from_year: int | None,
+    to_year: int | None,
+    limit: int,
+    fuzzy: bool,
+    sync: bool,
+    index_path: Path,
+) -> None:
+    """Search the library by title, subtitle and author tokens, and by year.
+
+    Renames made by the inbox loop happen outside BOOKS, so books filed into
+    BOOKS since the last sync are only found after passing `--sync`.
+    """
+    with SearchIndex(path=index_path) as index:
+        if sync or (len(index) == 0):
+            added, removed = index.sync(BOOKS)
+            echo(f"Indexed {added} files, removed {removed} files")
+        hits = index.search(
+            query, year_from=from_year, year_to=to_year, fuzzy=fuzzy, limit=limit
+        )
+    echo(repr_search_hits(hits))
+
+
+@main.command(name="serve", **CONTEXT_SETTINGS)
+@option("--host", type=str, default=DEFAULT_HOST, help="Host to listen on")
+@option("--port", type=int, default=DEFAULT_PORT, help="Port to listen on")
+@option(
+    "--socket",
+    type=Path,
+    default=None,
+    help="Unix socket to listen on, instead of a host and port",
+)
+@option("--workers", type=int, default=None, help="Number of worker processes")
+@option(
+    "--chunk-size",
+    type=int,
+    default=1_000,
+    help="Stems per chunk when running a batch in parallel",
+)
+def serve_(
+    *, host: str, port: int, socket: Path | None, workers: int | None, chunk_size: int
+) -> None:
+    """Serve parse, normalize and is-normalized over a local JSON API."""
+    serve(
+        host=host, port=port, socket=socket, max_workers=workers, chunk_size=chunk_size
+    )
 
 
 if __name__ == "__main__":
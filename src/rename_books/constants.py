@@ -6,6 +6,7 @@ DROPBOX = Path.home().joinpath("Dropbox")
 BOOKS_AND_PAPERS = DROPBOX.joinpath("1 – Derek", "Books and papers")
 BOOKS = BOOKS_AND_PAPERS.joinpath("Books")
 TEMPORARY_PATH = DROPBOX.joinpath("Temporary")
+DATA_PATH = Path.home().joinpath(".local", "share", "rename-books")
 
 
-__all__ = ["BOOKS", "BOOKS_AND_PAPERS", "DROPBOX", "TEMPORARY_PATH"]
+__all__ = ["BOOKS", "BOOKS_AND_PAPERS", "DATA_PATH", "DROPBOX", "TEMPORARY_PATH"]
@@ -0,0 +1,272 @@
+from __future__ import annotations
+
+from array import array
+from collections import Counter
+from dataclasses import dataclass, field
+from json import dumps, loads
+from os import scandir
+from pathlib import Path
+from shutil import rmtree
+from sys import byteorder
+from typing import TYPE_CHECKING, Any, Self
+
+from utilities.core import write_text
+
+from rename_books.classes import AuthorEtAl, MetaData, MetaDataFromPathError
+from rename_books.constants import BOOKS, DATA_PATH
+from rename_books.formats import BOOK_SUFFIXES
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+
+
+SNAPSHOT_PATH = DATA_PATH.joinpath("snapshot")
+_VERSION = 1
+_NULL = -1
+_TYPECODES = {
+    "path": "i",
+    "year": "i",
+    "title": "i",
+    "subtitles_offsets": "i",
+    "subtitles": "i",
+    "authors_offsets": "i",
+    "authors": "i",
+    "et_al": "b",
+    "suffix": "i",
+    "size": "q",
+    "mtime_ns": "q",
+}
+
+
+@dataclass(order=True, unsafe_hash=True, kw_only=True, slots=True)
+class SnapshotRow:
+    """The parsed metadata of a file in a library.
+
+    Files which could not be parsed have an empty title and no year.
+    """
+
+    path: str
+    year: int | None = None
+    title: str = ""
+    subtitles: tuple[str, ...] = ()
+    authors: tuple[str, ...] = ()
+    et_al: bool = False
+    suffix: str = ""
+    size: int = 0
+    mtime_ns: int = 0
+
+    @classmethod
+    def from_path(cls, path: Path, /, *, root: Path) -> Self:
+        """Construct a row by parsing and statting a file."""
+        stat = path.stat()
+        relative = str(path.relative_to(root))
+        try:
+            meta = MetaData.from_path(path)
+        except MetaDataFromPathError:
+            return cls(
+                path=relative,
+                suffix=path.suffix,
+                size=stat.st_size,
+                mtime_ns=stat.st_mtime_ns,
+            )
+        title, *subtitles = meta.title_and_subtitles or ("",)
+        match meta.authors:
+            case tuple() as authors:
+                et_al = False
+            case AuthorEtAl() as author_et_al:
+                authors, et_al = (author_et_al.author,), True
+        return cls(
+            path=relative,
+            year=meta.year,
+            title=title,
+            subtitles=tuple(subtitles),
+            authors=authors,
+            et_al=et_al,
+            suffix=path.suffix,
+            size=stat.st_size,
+            mtime_ns=stat.st_mtime_ns,
+        )
+
+
+@dataclass(kw_only=True)
+class Snapshot:
+    """A columnar snapshot of the parsed metadata of a library.
+
+    Numeric columns are arrays; string columns are indices into a table of
+    distinct strings; list columns are flat arrays with offsets, as in Arrow.
+    """
+
+    root: Path
+    strings: list[str] = field(default_factory=list)
+    columns: dict[str, array[int]] = field(
+        default_factory=lambda: {k: array(v) for k, v in _TYPECODES.items()}
+    )
+
+    def __len__(self) -> int:
+        return len(self.columns["path"])
+
+    def count_by_year(self) -> Counter[int]:
+        """Count the books published in each year."""
+        counts = Counter(self.columns["year"])
+        _ = counts.pop(_NULL, None)
+        return counts
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[SnapshotRow], /, *, root: Path) -> Self:
+        """Construct a snapshot from a set of rows."""
+        snapshot = cls(root=root)
+        ids: dict[str, int] = {}
+        columns = snapshot.columns
+
+        def intern(text: str, /) -> int:
+            if (id_ := ids.get(text)) is None:
+                id_ = ids[text] = len(snapshot.strings)
+                snapshot.strings.append(text)
+            return id_
+
+        columns["subtitles_offsets"].append(0)
+        columns["authors_offsets"].append(0)
+        for row in rows:
+            columns["path"].append(intern(row.path))
+            columns["year"].append(_NULL if row.year is None else row.year)
+            columns["title"].append(intern(row.title))
+            columns["subtitles"].extend(map(intern, row.subtitles))
+            columns["subtitles_offsets"].append(len(columns["subtitles"]))
+            columns["authors"].extend(map(intern, row.authors))
+            columns["authors_offsets"].append(len(columns["authors"]))
+            columns["et_al"].append(int(row.et_al))
+            columns["suffix"].append(intern(row.suffix))
+            columns["size"].append(row.size)
+            columns["mtime_ns"].append(row.mtime_ns)
+        return snapshot
+
+    @classmethod
+    def load(cls, directory: Path = SNAPSHOT_PATH, /) -> Self:
+        """Load a snapshot."""
+        manifest: dict[str, Any] = loads(
+            directory.joinpath("manifest.json").read_text()
+        )
+        if manifest["version"] != _VERSION:
+            raise SnapshotLoadError(*[f"{directory=}", f"{manifest['version']=}"])
+        strings = directory.joinpath("strings.bin").read_bytes().decode().split("\0")
+        columns: dict[str, array[int]] = {}
+        for name, typecode in _TYPECODES.items():
+            column, spec = array(typecode), manifest["columns"][name]
+            if (spec["typecode"], spec["itemsize"]) != (typecode, column.itemsize):
+                raise SnapshotLoadError(*[f"{directory=}", f"{name=}"])
+            column.frombytes(directory.joinpath(f"{name}.bin").read_bytes())
+            if manifest["byteorder"] != byteorder:
+                column.byteswap()
+            columns[name] = column
+        return cls(root=Path(manifest["root"]), strings=strings, columns=columns)
+
+    def save(self, directory: Path = SNAPSHOT_PATH, /) -> None:
+        """Save the snapshot, replacing any existing one."""
+        temp = directory.with_name(f".{directory.name}.tmp")
+        rmtree(temp, ignore_errors=True)
+        temp.mkdir(parents=True)
+        _ = temp.joinpath("strings.bin").write_bytes("\0".join(self.strings).encode())
+        for name, column in self.columns.items():
+            with temp.joinpath(f"{name}.bin").open(mode="wb") as fh:
+                column.tofile(fh)
+        manifest = {
+            "version": _VERSION,
+            "root": str(self.root),
+            "count": len(self),
+            "byteorder": byteorder,
+            "columns": {
+                name: {"typecode": column.typecode, "itemsize": column.itemsize}
+                for name, column in self.columns.items()
+            },
+        }
+        write_text(temp.joinpath("manifest.json"), dumps(manifest), overwrite=True)
+        old = directory.with_name(f".{directory.name}.old")
+        rmtree(old, ignore_errors=True)
+        if directory.exists():
+            _ = directory.rename(old)
+        _ = temp.rename(directory)
+        rmtree(old, ignore_errors=True)
+
+    @property
+    def rows(self) -> Iterator[SnapshotRow]:
+        """The rows of the snapshot."""
+        strings, columns = self.strings, self.columns
+        subtitles, authors = columns["subtitles"], columns["authors"]
+        subtitles_offsets = columns["subtitles_offsets"]
+        authors_offsets = columns["authors_offsets"]
+        for i in range(len(self)):
+            year = columns["year"][i]
+            s_start, s_end = subtitles_offsets[i], subtitles_offsets[i + 1]
+            a_start, a_end = authors_offsets[i], authors_offsets[i + 1]
+            yield SnapshotRow(
+                path=strings[columns["path"][i]],
+                year=None if year == _NULL else year,
+                title=strings[columns["title"][i]],
+                subtitles=tuple(strings[j] for j in subtitles[s_start:s_end]),
+                authors=tuple(strings[j] for j in authors[a_start:a_end]),
+                et_al=bool(columns["et_al"][i]),
+                suffix=strings[columns["suffix"][i]],
+                size=columns["size"][i],
+                mtime_ns=columns["mtime_ns"][i],
+            )
+
+    def top_authors(self, n: int = 10, /) -> list[tuple[str, int]]:
+        """Get the authors with the most books."""
+        counts = Counter(self.columns["authors"])
+        return [(self.strings[id_], count) for id_, count in counts.most_common(n)]
+
+
+class SnapshotLoadError(Exception): ...
+
+
+def export_library(
+    path: Path = BOOKS, /, *, directory: Path = SNAPSHOT_PATH
+) -> tuple[Snapshot, int]:
+    """Export a snapshot of a library, reusing the rows of unchanged files.
+
+    Return the snapshot and the number of files parsed afresh.
+    """
+    previous: dict[str, SnapshotRow] = {}
+    try:
+        snapshot = Snapshot.load(directory)
+    except (FileNotFoundError, SnapshotLoadError):
+        pass
+    else:
+        if snapshot.root == path:
+            previous = {r.path: r for r in snapshot.rows}
+    rows: list[SnapshotRow] = []
+    parsed = 0
+    for relative, size, mtime_ns in _scan(path):
+        row = previous.get(relative)
+        if (row is None) or ((row.size, row.mtime_ns) != (size, mtime_ns)):
+            row = SnapshotRow.from_path(path.joinpath(relative), root=path)
+            parsed += 1
+        rows.append(row)
+    snapshot = Snapshot.from_rows(rows, root=path)
+    snapshot.save(directory)
+    return snapshot, parsed
+
+
+def _scan(root: Path, /) -> Iterator[tuple[str, int, int]]:
+    """Yield the relative path, size and modification time of each book."""
+    stack = [root]
+    found: list[tuple[str, int, int]] = []
+    while len(stack) >= 1:
+        with scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(Path(entry.path))
+                elif entry.is_file() and (Path(entry.name).suffix in BOOK_SUFFIXES):
+                    stat = entry.stat()
+                    relative = str(Path(entry.path).relative_to(root))
+                    found.append((relative, stat.st_size, stat.st_mtime_ns))
+    yield from sorted(found)
+
+
+__all__ = [
+    "SNAPSHOT_PATH",
+    "Snapshot",
+    "SnapshotLoadError",
+    "SnapshotRow",
+    "export_library",
+]
@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from itertools import count
+from pathlib import Path
+from time import sleep
+from typing import TYPE_CHECKING, Protocol
+
+from rename_books.cache import FileIdentity
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+
+class FileSystem(Protocol):
+    """The filesystem operations used to scan and rename books."""
+
+    def exists(self, path: Path, /) -> bool: ...
+
+    def identity(self, path: Path, /) -> FileIdentity: ...
+
+    def is_file(self, path: Path, /) -> bool: ...
+
+    def iterdir(self, path: Path, /) -> Iterator[Path]: ...
+
+    def read_head(self, path: Path, size: int, /) -> bytes: ...
+
+    def rename(self, source: Path, target: Path, /) -> None: ...
+
+    def touch(self, path: Path, /) -> None: ...
+
+    def walk_files(self, path: Path, /) -> Iterator[Path]: ...
+
+    def write_bytes(self, path: Path, data: bytes, /) -> None: ...
+
+
+@dataclass(frozen=True, kw_only=True, slots=True)
+class LocalFileSystem:
+    """The filesystem on disk."""
+
+    def exists(self, path: Path, /) -> bool:
+        return path.exists()
+
+    def identity(self, path: Path, /) -> FileIdentity:
+        return FileIdentity.from_path(path)
+
+    def is_file(self, path: Path, /) -> bool:
+        return path.is_file()
+
+    def iterdir(self, path: Path, /) -> Iterator[Path]:
+        return path.iterdir()
+
+    def read_head(self, path: Path, size: int, /) -> bytes:
+        with path.open(mode="rb") as fh:
+            return fh.read(size)
+
+    def rename(self, source: Path, target: Path, /) -> None:
+        _ = source.rename(target)
+
+    def touch(self, path: Path, /) -> None:
+        path.touch()
+
+    def walk_files(self, path: Path, /) -> Iterator[Path]:
+        return (p for p in path.rglob("*") if p.is_file())
+
+    def write_bytes(self, path: Path, data: bytes, /) -> None:
+        _ = path.write_bytes(data)
+
+
+LOCAL_FILESYSTEM = LocalFileSystem()
+_MEMORY_DEVICES = count(start=-1, step=-1)
+
+
+@dataclass(kw_only=True)
+class MemoryFileSystem:
+    """A filesystem held in memory, for simulating inboxes without disk.
+
+    Each listing sleeps for `listing_delay`, and renaming a file in `failures`
+    raises its error. Each instance has its own negative device number, never
+    reused, so the identities of files in distinct instances never collide.
+    """
+
+    listing_delay: float = 0.0
+    failures: dict[Path, OSError] = field(default_factory=dict)
+    _dirs: dict[Path, set[str]] = field(
+        default_factory=lambda: {Path("/"): set()}, init=False, repr=False
+    )
+    _files: dict[Path, _MemoryFile] = field(
+        default_factory=dict, init=False, repr=False
+    )
+    _clock: count[int] = field(default_factory=count, init=False, repr=False)
+    _device: int = field(
+        default_factory=lambda: next(_MEMORY_DEVICES), init=False, repr=False
+    )
+
+    def __len__(self) -> int:
+        return len(self._files)
+
+    def exists(self, path: Path, /) -> bool:
+        return (path in self._files) or (path in self._dirs)
+
+    def identity(self, path: Path, /) -> FileIdentity:
+        file = self._get_file(path)
+        return FileIdentity(
+            device=self._device,
+            inode=file.inode,
+            size=len(file.data),
+            mtime_ns=file.mtime_ns,
+        )
+
+    def is_file(self, path: Path, /) -> bool:
+        return path in self._files
+
+    def iterdir(self, path: Path, /) -> Iterator[Path]:
+        if (names := self._dirs.get(path)) is None:
+            raise self._missing_dir(path)
+        if self.listing_delay > 0.0:
+            sleep(self.listing_delay)
+        return (path.joinpath(n) for n in list(names))
+
+    def read_head(self, path: Path, size: int, /) -> bytes:
+        return self._get_file(path).data[:size]
+
+    def mkdir(self, path: Path, /) -> None:
+        """Make a directory and its parents, if they do not exist."""
+        if path in self._files:
+            raise FileExistsError(path)
+        _ = self._dirs.setdefault(path, set())
+        while path != path.parent:
+            names = self._dirs.setdefault(path.parent, set())
+            if path.name in names:
+                return
+            names.add(path.name)
+            path = path.parent
+
+    def rename(self, source: Path, target: Path, /) -> None:
+        if (error := self.failures.get(source)) is not None:
+            raise error
+        file = self._get_file(source)
+        if target.parent not in self._dirs:
+            raise self._missing_dir(target.parent)
+        if target in self._dirs:
+            raise IsADirectoryError(target)
+        del self._files[source]
+        self._dirs[source.parent].remove(source.name)
+        self._files[target] = file
+        self._dirs[target.parent].add(target.name)
+
+    def touch(self, path: Path, /) -> None:
+        if (path in self._dirs) or (path in self._files):
+            return
+        self.write_bytes(path, b"")
+
+    def walk_files(self, path: Path, /) -> Iterator[Path]:
+        stack = [path]
+        while len(stack) >= 1:
+            for child in self.iterdir(stack.pop()):
+                if child in self._dirs:
+                    stack.append(child)
+                else:
+                    yield child
+
+    def write_bytes(self, path: Path, data: bytes, /) -> None:
+        """Write the contents of a file, creating it if it does not exist."""
+        if (file := self._files.get(path)) is None:
+            self.mkdir(path.parent)
+            file = self._files[path] = _MemoryFile(inode=next(self._clock))
+            self._dirs[path.parent].add(path.name)
+        file.data = data
+        file.mtime_ns = next(self._clock)
+
+    def _get_file(self, path: Path, /) -> _MemoryFile:
+        try:
+            return self._files[path]
+        except KeyError:
+            raise FileNotFoundError(path) from None
+
+    def _missing_dir(self, path: Path, /) -> OSError:
+        if path in self._files:
+            return NotADirectoryError(path)
+        return FileNotFoundError(path)
+
+
+@dataclass(kw_only=True, slots=True)
+class _MemoryFile:
+    inode: int
+    mtime_ns: int = 0
+    data: bytes = b""
+
+
+__all__ = ["LOCAL_FILESYSTEM", "FileSystem", "LocalFileSystem", "MemoryFileSystem"]
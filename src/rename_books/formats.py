@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from rename_books.filesystem import LOCAL_FILESYSTEM
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from rename_books.cache import ContentCache, FileIdentity
+    from rename_books.filesystem import FileSystem
+
+
+BOOK_SUFFIXES = frozenset({".azw3", ".djvu", ".epub", ".mobi", ".pdf"})
+HEAD_SIZE = 4_096
+_CACHE_KEY = "format"
+_MOBI_SUFFIXES = {".azw3", ".mobi"}
+_PDF_OFFSET = 1_024
+_MEMO_SIZE = 100_000
+_memo: dict[FileIdentity, str | None] = {}
+
+
+def detect_format(
+    path: Path,
+    /,
+    *,
+    filesystem: FileSystem = LOCAL_FILESYSTEM,
+    cache: ContentCache | None = None,
+) -> str | None:
+    """Detect the format of a book from its leading bytes, if it is one.
+
+    Results are cached by file identity, so each file is read at most once;
+    reading a changed file drops the entries for its stale versions. A MOBI
+    file named as an AZW3 keeps its suffix unless its header says otherwise.
+    """
+    identity = filesystem.identity(path)
+    try:
+        suffix = _memo[identity]
+    except KeyError:
+        if (cache is not None) and (
+            (value := cache.get(identity, _CACHE_KEY)) is not None
+        ):
+            suffix = value["suffix"]
+        else:
+            suffix = sniff_format(filesystem.read_head(path, HEAD_SIZE))
+            if cache is not None:
+                _ = cache.invalidate_identities([identity])
+                cache.put(identity, _CACHE_KEY, {"suffix": suffix})
+        if len(_memo) >= _MEMO_SIZE:
+            _memo.clear()
+        _memo[identity] = suffix
+    if (suffix == ".mobi") and (path.suffix in _MOBI_SUFFIXES):
+        return path.suffix
+    return suffix
+
+
+def sniff_format(head: bytes, /) -> str | None:
+    """Get the suffix of the format of a file from its leading bytes."""
+    if (
+        head.startswith(b"PK\x03\x04")
+        and (head[30:38] == b"mimetype")
+        and (head[38:58] == b"application/epub+zip")
+    ):
+        return ".epub"
+    if head[60:68] == b"BOOKMOBI":
+        return ".azw3" if _mobi_version(head) == 8 else ".mobi"
+    if head.startswith(b"AT&TFORM"):
+        return ".djvu"
+    if b"%PDF-" in head[:_PDF_OFFSET]:
+        return ".pdf"
+    return None
+
+
+def _mobi_version(head: bytes, /) -> int | None:
+    """Get the version of the MOBI header of the first record, if it was read."""
+    record = int.from_bytes(head[78:82])
+    if (len(head) < record + 40) or (head[record + 16 : record + 20] != b"MOBI"):
+        return None
+    return int.from_bytes(head[record + 36 : record + 40])
+
+
+__all__ = ["BOOK_SUFFIXES", "HEAD_SIZE", "detect_format", "sniff_format"]
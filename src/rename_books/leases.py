@@ -0,0 +1,247 @@
+from __future__ import annotations
+
+from contextlib import contextmanager, suppress
+from dataclasses import dataclass
+from hashlib import sha256
+from json import JSONDecodeError, dumps, loads
+from logging import getLogger
+from os import O_CREAT, O_EXCL, O_WRONLY, fsync, getpid, link, write
+from os import close as os_close
+from os import open as os_open
+from socket import gethostname
+from threading import Event, Thread
+from time import sleep, time
+from typing import TYPE_CHECKING
+from uuid import uuid4
+
+from rename_books.constants import TEMPORARY_PATH
+from rename_books.lib import yield_next_files
+
+if TYPE_CHECKING:
+    from collections.abc import Container, Generator
+    from pathlib import Path
+
+    from rename_books.cache import ContentCache
+
+
+_LOGGER = getLogger(__name__)
+LEASE_DIRECTORY_NAME = ".rename-books-leases"
+DEFAULT_DURATION = 3_600.0
+
+
+@dataclass(kw_only=True, slots=True)
+class Lease:
+    """A claim on a file by a worker, which expires unless renewed."""
+
+    path: Path
+    worker: str
+    expires: float
+
+    @property
+    def is_held(self) -> bool:
+        """Check if the lease is still held by its worker."""
+        return (self.expires > time()) and (
+            _get_winner(_get_lease_path(self.path)) == self.worker
+        )
+
+    @property
+    def lease_path(self) -> Path:
+        """The path of the lease file."""
+        return _get_lease_path(self.path)
+
+    def release(self) -> None:
+        """Release the lease."""
+        if _get_winner(self.lease_path) == self.worker:
+            self.lease_path.unlink(missing_ok=True)
+
+    def renew(self, *, duration: float = DEFAULT_DURATION) -> None:
+        """Extend the lease, if it is still held by its worker."""
+        if (winner := _get_winner(self.lease_path)) != self.worker:
+            raise LeaseLostError(*[f"{self=}", f"{winner=}"])
+        self.expires = time() + duration
+        temp = self.lease_path.with_name(f".{self.lease_path.name}.{uuid4().hex}")
+        _ = temp.write_text(self.to_json)
+        _ = temp.replace(self.lease_path)
+
+    @property
+    def to_json(self) -> str:
+        """Construct a JSON string from the lease."""
+        return dumps({
+            "name": self.path.name,
+            "worker": self.worker,
+            "expires": self.expires,
+        })
+
+
+class LeaseLostError(Exception): ...
+
+
+def claim(
+    path: Path, /, *, worker: str | None = None, duration: float = DEFAULT_DURATION
+) -> Lease | None:
+    """Atomically claim a file, unless another worker holds a lease on it."""
+    worker = get_worker_id() if worker is None else worker
+    lease_path = _get_lease_path(path)
+    lease_path.parent.mkdir(parents=True, exist_ok=True)
+    lease = Lease(path=path, worker=worker, expires=time() + duration)
+    for _ in range(2):
+        try:
+            fd = os_open(lease_path, O_CREAT | O_EXCL | O_WRONLY)
+        except FileExistsError:
+            existing = _read_lease(path, lease_path)
+            if existing is None:
+                if _is_being_written(lease_path):
+                    return None
+            elif existing.expires > time():
+                return existing if existing.worker == worker else None
+            if not _break(lease_path, existing):
+                return None
+            continue
+        try:
+            _ = write(fd, lease.to_json.encode())
+            fsync(fd)
+        finally:
+            os_close(fd)
+        return lease
+    return None
+
+
+def claim_next_file(
+    *,
+    path: Path = TEMPORARY_PATH,
+    worker: str | None = None,
+    skips: Container[Path] | None = None,
+    start: Path | None = None,
+    duration: float = DEFAULT_DURATION,
+    settle: float = 0.0,
+    cache: ContentCache | None = None,
+) -> Lease | None:
+    """Claim the next file to process, if it exists.
+
+    On a synced folder, `settle` is the time to wait for other machines' leases
+    to arrive before confirming that the claim is still held. The inbox is
+    scanned once, claiming candidates in order, with formats looked up in
+    `cache` if given.
+    """
+    for candidate in yield_next_files(path=path, skips=skips, start=start, cache=cache):
+        if (lease := claim(candidate, worker=worker, duration=duration)) is None:
+            continue
+        if settle > 0.0:
+            sleep(settle)
+        if lease.is_held and candidate.exists():
+            return lease
+        lease.release()
+    return None
+
+
+def get_worker_id() -> str:
+    """Get the ID of the current worker."""
+    return f"{gethostname()}-{getpid()}"
+
+
+@contextmanager
+def yield_renewing(
+    lease: Lease, /, *, interval: float = 60.0, duration: float = DEFAULT_DURATION
+) -> Generator[Lease]:
+    """Renew a lease in the background, then release it.
+
+    If the lease is lost to another worker, renewal stops and `LeaseLostError`
+    is raised on exit.
+    """
+    stop = Event()
+    lost: list[LeaseLostError] = []
+
+    def run() -> None:
+        while not stop.wait(interval):
+            try:
+                lease.renew(duration=duration)
+            except LeaseLostError as error:
+                _LOGGER.warning("Lost lease on %r", str(lease.path))
+                lost.append(error)
+                return
+
+    thread = Thread(target=run, daemon=True)
+    thread.start()
+    try:
+        yield lease
+    finally:
+        stop.set()
+        thread.join()
+        lease.release()
+    if len(lost) >= 1:
+        raise lost[0]
+
+
+def _break(lease_path: Path, stale: Lease | None, /) -> bool:
+    """Break a stale lease, checking that it was not replaced in the meantime."""
+    tomb = lease_path.with_name(f".{lease_path.name}.{uuid4().hex}.stale")
+    try:
+        _ = lease_path.rename(tomb)
+    except FileNotFoundError:
+        return True
+    broken = _read_lease(lease_path, tomb)
+    if (stale is None) or (
+        (broken is not None)
+        and ((broken.worker, broken.expires) == (stale.worker, stale.expires))
+    ):
+        tomb.unlink(missing_ok=True)
+        _LOGGER.info("Broke stale lease %r", str(lease_path))
+        return True
+    with suppress(FileExistsError):
+        link(tomb, lease_path)
+    tomb.unlink(missing_ok=True)
+    return False
+
+
+def _get_lease_path(path: Path, /) -> Path:
+    digest = sha256(path.name.encode()).hexdigest()[:32]
+    return path.parent.joinpath(LEASE_DIRECTORY_NAME, f"{digest}.lease")
+
+
+def _get_winner(lease_path: Path, /) -> str | None:
+    """Get the worker holding a lease, resolving copies made by sync conflicts."""
+    stem = lease_path.stem
+    try:
+        names = [
+            p
+            for p in lease_path.parent.iterdir()
+            if (p.name == lease_path.name)
+            or (p.name.startswith(f"{stem} (") and (p.suffix == lease_path.suffix))
+        ]
+    except FileNotFoundError:
+        return None
+    now = time()
+    workers = [
+        lease.worker
+        for p in names
+        if ((lease := _read_lease(p, p)) is not None) and (lease.expires > now)
+    ]
+    return min(workers, default=None)
+
+
+def _is_being_written(lease_path: Path, /, *, grace: float = 10.0) -> bool:
+    """Check if an unreadable lease was created too recently to be abandoned."""
+    try:
+        return time() - lease_path.stat().st_mtime < grace
+    except FileNotFoundError:
+        return False
+
+
+def _read_lease(path: Path, lease_path: Path, /) -> Lease | None:
+    try:
+        data = loads(lease_path.read_text())
+    except (FileNotFoundError, JSONDecodeError):
+        return None
+    return Lease(path=path, worker=data["worker"], expires=data["expires"])
+
+
+__all__ = [
+    "DEFAULT_DURATION",
+    "LEASE_DIRECTORY_NAME",
+    "Lease",
+    "LeaseLostError",
+    "claim",
+    "claim_next_file",
+    "get_worker_id",
+    "yield_renewing",
+]
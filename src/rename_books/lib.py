@@ -1,51 +1,180 @@
 from __future__ import annotations
 
+from bisect import bisect_left
+from itertools import chain
+from pathlib import Path
 from re import search
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any, Literal
 
 from prompt_toolkit import prompt
 from prompt_toolkit.completion import WordCompleter
 from prompt_toolkit.validation import Validator
 
-from rename_books.classes import MetaData
-from rename_books.constants import TEMPORARY_PATH
+from rename_books.classes import (
+    AuthorEtAl,
+    MetaData,
+    MetaDataFromPathError,
+    MetaDataWithAllMetaDataError,
+    StemMetaData,
+    StemMetaDataFromTextError,
+    StemMetaDataWithAllMetaDataError,
+)
+from rename_books.constants import BOOKS, TEMPORARY_PATH
+from rename_books.filesystem import LOCAL_FILESYSTEM
+from rename_books.formats import BOOK_SUFFIXES, detect_format
+from rename_books.tracing import span
 
 if TYPE_CHECKING:
-    from pathlib import Path
+    from collections.abc import Container, Iterator
 
+    from rename_books.cache import ContentCache
+    from rename_books.filesystem import FileSystem
+
+_PARTIAL_SUFFIXES = {".crdownload", ".download", ".part"}
+
+
+def get_next_file(
+    *,
+    path: Path = TEMPORARY_PATH,
+    skips: Container[Path] | None = None,
+    start: Path | None = None,
+    filesystem: FileSystem = LOCAL_FILESYSTEM,
+    cache: ContentCache | None = None,
+) -> Path | None:
+    """Get the next file to process, if it exists.
+
+    Files are considered in sorted order, beginning at `start` and wrapping
+    around, and only until the first one needing processing is found. Formats
+    are looked up in `cache`, if given, before any file is read.
+    """
+    with span("get_next_file"):
+        return next(
+            yield_next_files(
+                path=path, skips=skips, start=start, filesystem=filesystem, cache=cache
+            ),
+            None,
+        )
 
-def get_next_file(*, skips: set[Path] | None = None) -> Path | None:
-    """Get the next file to process, if it exists."""
-    paths = (path for path in TEMPORARY_PATH.iterdir() if _needs_processing(path))
-    if skips is not None:
-        paths = (path for path in paths if path not in skips)
-    try:
-        return next(iter(sorted(paths)))
-    except StopIteration:
-        return None
 
+def yield_next_files(
+    *,
+    path: Path = TEMPORARY_PATH,
+    skips: Container[Path] | None = None,
+    start: Path | None = None,
+    filesystem: FileSystem = LOCAL_FILESYSTEM,
+    cache: ContentCache | None = None,
+) -> Iterator[Path]:
+    """Yield the files to process, in the order of `get_next_file`.
 
-def _needs_processing(path: Path, /) -> bool:
-    """Check if a file needs processing."""
-    return (
-        path.is_file()
-        and (path.suffix in {".epub", ".pdf"})
-        and not MetaData.is_normalized(path)
-        and not search(".part", path.stem)
-    )
+    The directory is listed once, and each file is checked only when reached.
+    """
+    paths = sorted(filesystem.iterdir(path))
+    if start is not None:
+        i = bisect_left(paths, start)
+        paths = chain(paths[i:], paths[:i])
+    for p in paths:
+        if ((skips is None) or (p not in skips)) and _needs_processing(
+            p, filesystem=filesystem, cache=cache
+        ):
+            yield p
+
+
+def _needs_processing(
+    path: Path,
+    /,
+    *,
+    filesystem: FileSystem = LOCAL_FILESYSTEM,
+    cache: ContentCache | None = None,
+) -> bool:
+    """Check if a file is a book, judged by its contents, which needs processing."""
+    if (
+        (not filesystem.is_file(path))
+        or (path.suffix in _PARTIAL_SUFFIXES)
+        or search(".part", path.stem)
+    ):
+        return False
+    try:
+        suffix = detect_format(path, filesystem=filesystem, cache=cache)
+    except FileNotFoundError:
+        return False
+    return (suffix is not None) and not MetaData.is_normalized(path, suffix=suffix)
 
 
 def get_decision(path: Path, /) -> bool:
     """Get the decision for a given path."""
-    result = prompt(
-        f"File = {path.name}\nProcess or skip? ",
-        completer=WordCompleter(["process", "skip"]),
-        default="process",
-        mouse_support=True,
-        validator=Validator.from_callable(
-            lambda text: bool(search(r"(process|skip)", text)),
-            error_message="Enter 'process' or 'skip'",
-        ),
-        vi_mode=True,
-    ).strip()
+    with span("prompt", kind="decision"):
+        result = prompt(
+            f"File = {path.name}\nProcess or skip? ",
+            completer=WordCompleter(["process", "skip"]),
+            default="process",
+            mouse_support=True,
+            validator=Validator.from_callable(
+                lambda text: bool(search(r"(process|skip)", text)),
+                error_message="Enter 'process' or 'skip'",
+            ),
+            vi_mode=True,
+        ).strip()
     return result == "process"
+
+
+def normalize_text(
+    text: str, /
+) -> tuple[str | None, Literal["normalized", "changed", "error"]]:
+    """Normalize a stem or a path, reporting whether it was already normalized.
+
+    Any failure to parse is reported as an error for this text alone, so one
+    bad line cannot abort a batch.
+    """
+    try:
+        if _is_path(text):
+            normalized = str(MetaData.normalize(Path(text)))
+        else:
+            normalized = StemMetaData.normalize(text)
+    except (
+        MetaDataFromPathError,
+        MetaDataWithAllMetaDataError,
+        StemMetaDataFromTextError,
+        StemMetaDataWithAllMetaDataError,
+    ):
+        return None, "error"
+    return normalized, "normalized" if normalized == text else "changed"
+
+
+def parse_text(text: str, /) -> dict[str, Any] | None:
+    """Parse a stem or a path into its metadata, if possible."""
+    try:
+        stem = StemMetaData.from_text(Path(text).stem if _is_path(text) else text)
+    except StemMetaDataFromTextError:
+        return None
+    match stem.authors:
+        case tuple() as authors:
+            authors, et_al = list(authors), False
+        case AuthorEtAl() as author_et_al:
+            authors, et_al = [author_et_al.author], True
+    return {
+        "year": stem.year,
+        "title_and_subtitles": list(stem.title_and_subtitles),
+        "authors": authors,
+        "et_al": et_al,
+    }
+
+
+def yield_authors(
+    path: Path = BOOKS, /, *, filesystem: FileSystem = LOCAL_FILESYSTEM
+) -> Iterator[str]:
+    """Yield the authors of every book in a library, once per book."""
+    for p in sorted(filesystem.walk_files(path)):
+        if p.suffix in BOOK_SUFFIXES:
+            try:
+                meta = MetaData.from_path(p)
+            except MetaDataFromPathError:
+                continue
+            match meta.authors:
+                case tuple() as authors:
+                    yield from authors
+                case AuthorEtAl() as author_et_al:
+                    yield author_et_al.author
+
+
+def _is_path(text: str, /) -> bool:
+    return ("/" in text) or (Path(text).suffix in BOOK_SUFFIXES)
@@ -0,0 +1,281 @@
+from __future__ import annotations
+
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from json import dumps, loads
+from logging import getLogger
+from pathlib import Path
+from threading import Lock
+from typing import TYPE_CHECKING, Any, Self
+
+from utilities.core import write_text
+
+from rename_books.classes import (
+    MetaData,
+    MetaDataFromPathError,
+    MetaDataWithAllMetaDataError,
+)
+from rename_books.constants import BOOKS, DATA_PATH
+from rename_books.formats import BOOK_SUFFIXES, detect_format
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+
+
+_LOGGER = getLogger(__name__)
+CHECKPOINT_PATH = DATA_PATH.joinpath("migrate.json")
+
+
+@dataclass(order=True, unsafe_hash=True, kw_only=True, slots=True)
+class Rename:
+    """A single rename of a file."""
+
+    source: Path
+    target: Path
+
+
+@dataclass(kw_only=True, slots=True)
+class MigrationPlan:
+    """A set of renames, grouped by directory and ordered to be cycle-safe."""
+
+    steps: dict[Path, list[Rename]] = field(default_factory=dict)
+    conflicts: list[Rename] = field(default_factory=list)
+    root: Path | None = None
+
+    @classmethod
+    def from_json(cls, text: str, /) -> Self:
+        """Construct a plan from a JSON string."""
+        data: dict[str, Any] = loads(text)
+        return cls(
+            steps={
+                Path(d): [Rename(source=Path(s), target=Path(t)) for s, t in steps]
+                for d, steps in data["steps"].items()
+            },
+            conflicts=[
+                Rename(source=Path(s), target=Path(t)) for s, t in data["conflicts"]
+            ],
+            root=None if (root := data.get("root")) is None else Path(root),
+        )
+
+    @property
+    def num_steps(self) -> int:
+        """The total number of steps in the plan."""
+        return sum(map(len, self.steps.values()))
+
+    @property
+    def to_json(self) -> str:
+        """Construct a JSON string from the plan."""
+        return dumps({
+            "steps": {
+                str(d): [[str(r.source), str(r.target)] for r in steps]
+                for d, steps in self.steps.items()
+            },
+            "conflicts": [[str(r.source), str(r.target)] for r in self.conflicts],
+            "root": None if self.root is None else str(self.root),
+        })
+
+    def yield_lines(self) -> Iterator[str]:
+        """Yield a human-readable description of the plan."""
+        for directory, steps in self.steps.items():
+            yield f"{directory}:"
+            for step in steps:
+                yield f"    {step.source.name!r} --> {step.target.name!r}"
+        for conflict in self.conflicts:
+            yield f"Conflict: {str(conflict.source)!r} --> {str(conflict.target)!r}"
+
+
+def compute_renames(
+    path: Path = BOOKS, /, *, max_workers: int | None = None, chunksize: int = 256
+) -> list[Rename]:
+    """Compute the renames required to normalize a library, in parallel."""
+    sources = sorted(
+        p for p in path.rglob("*") if p.is_file() and (p.suffix in BOOK_SUFFIXES)
+    )
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        targets = list(pool.map(_normalize, sources, chunksize=chunksize))
+    return [
+        Rename(source=s, target=t)
+        for s, t in zip(sources, targets, strict=True)
+        if (t is not None) and (t != s)
+    ]
+
+
+def _normalize(path: Path, /) -> Path | None:
+    try:
+        return MetaData.normalize(path, suffix=detect_format(path))
+    except (MetaDataFromPathError, MetaDataWithAllMetaDataError):
+        return None
+
+
+def plan_renames(
+    renames: Iterable[Rename], /, *, root: Path | None = None
+) -> MigrationPlan:
+    """Order a set of renames under a root, resolving chains and cycles.
+
+    Renames whose targets collide with each other, or with files which are not
+    themselves being renamed, are reported as conflicts.
+    """
+    by_source = {r.source: r for r in renames}
+    counts = Counter(r.target for r in by_source.values())
+    by_target = {r.target: r for r in by_source.values()}
+    conflicts: set[Rename] = set()
+    queue = [r for r in by_source.values() if counts[r.target] >= 2]
+    queue.extend(
+        r
+        for r in by_source.values()
+        if (counts[r.target] == 1) and (r.target not in by_source) and not _is_free(r)
+    )
+    while len(queue) >= 1:
+        rename = queue.pop()
+        if rename in conflicts:
+            continue
+        conflicts.add(rename)
+        del by_source[rename.source]
+        if ((blocked := by_target.get(rename.source)) is not None) and (
+            blocked not in conflicts
+        ):
+            queue.append(blocked)
+    steps: dict[Path, list[Rename]] = {}
+    for group in _yield_groups(by_source):
+        directory = group[0].source.parent
+        steps.setdefault(directory, []).extend(group)
+    return MigrationPlan(steps=steps, conflicts=sorted(conflicts), root=root)
+
+
+def _is_free(rename: Rename, /) -> bool:
+    target = rename.target
+    return (not target.exists()) or rename.source.samefile(target)
+
+
+def _yield_groups(by_source: dict[Path, Rename], /) -> Iterator[list[Rename]]:
+    targets = {r.target for r in by_source.values()}
+    visited: set[Path] = set()
+    for rename in sorted(by_source.values()):
+        if (rename.source in targets) or (rename.source in visited):
+            continue
+        chain = list(_yield_chain(rename, by_source))
+        visited.update(r.source for r in chain)
+        yield chain[::-1]
+    for rename in sorted(by_source.values()):
+        if rename.source in visited:
+            continue
+        cycle = list(_yield_chain(rename, by_source))
+        visited.update(r.source for r in cycle)
+        head, *tail = cycle
+        temp = _get_temp_path(head.source)
+        yield [
+            Rename(source=head.source, target=temp),
+            *tail[::-1],
+            Rename(source=temp, target=head.target),
+        ]
+
+
+def _yield_chain(rename: Rename, by_source: dict[Path, Rename], /) -> Iterator[Rename]:
+    current: Rename | None = rename
+    seen: set[Path] = set()
+    while (current is not None) and (current.source not in seen):
+        yield current
+        seen.add(current.source)
+        current = by_source.get(current.target)
+
+
+def _get_temp_path(path: Path, /) -> Path:
+    temp = path.with_name(f".{path.name}.migrating")
+    i = 0
+    while temp.exists():
+        i += 1
+        temp = path.with_name(f".{path.name}.migrating.{i}")
+    return temp
+
+
+def apply_plan(
+    plan: MigrationPlan,
+    /,
+    *,
+    checkpoint: Path = CHECKPOINT_PATH,
+    max_workers: int | None = None,
+) -> None:
+    """Apply a plan, one thread per directory, recording progress to a checkpoint."""
+    checkpoint.parent.mkdir(parents=True, exist_ok=True)
+    if not checkpoint.exists():
+        write_text(checkpoint, plan.to_json, overwrite=True)
+    journal = _get_journal_path(checkpoint)
+    done = _read_journal(journal)
+    lock = Lock()
+    with (
+        journal.open(mode="a") as fh,
+        ThreadPoolExecutor(max_workers=max_workers) as pool,
+    ):
+
+        def apply_directory(directory: Path, steps: list[Rename], /) -> None:
+            for i, step in enumerate(steps):
+                if (str(directory), i) in done:
+                    continue
+                _apply_step(step)
+                with lock:
+                    _ = fh.write(f"{directory}\t{i}\n")
+                    fh.flush()
+
+        futures = [pool.submit(apply_directory, d, s) for d, s in plan.steps.items()]
+        for future in futures:
+            future.result()
+    checkpoint.unlink()
+    journal.unlink()
+
+
+def _apply_step(step: Rename, /) -> None:
+    if (not step.source.exists()) and step.target.exists():
+        return
+    if step.target.exists() and not step.source.samefile(step.target):
+        raise ApplyPlanTargetExistsError(*[f"{step=}"])
+    _LOGGER.info("Renaming\n    %r\n--> %r", str(step.source), str(step.target))
+    _ = step.source.rename(step.target)
+
+
+class ApplyPlanTargetExistsError(Exception): ...
+
+
+def load_plan(
+    checkpoint: Path = CHECKPOINT_PATH, /, *, root: Path | None = None
+) -> MigrationPlan | None:
+    """Load the plan of an interrupted migration, if it exists.
+
+    Given a root, a plan for any other root is refused rather than resumed.
+    """
+    if not checkpoint.exists():
+        return None
+    plan = MigrationPlan.from_json(checkpoint.read_text())
+    if (root is not None) and (plan.root != root):
+        raise LoadPlanRootError(*[f"{checkpoint=}", f"{root=}", f"{plan.root=}"])
+    return plan
+
+
+class LoadPlanRootError(Exception): ...
+
+
+def _get_journal_path(checkpoint: Path, /) -> Path:
+    return checkpoint.with_name(f"{checkpoint.name}.done")
+
+
+def _read_journal(journal: Path, /) -> set[tuple[str, int]]:
+    if not journal.exists():
+        return set()
+    done: set[tuple[str, int]] = set()
+    for line in journal.read_text().splitlines():
+        directory, _, i = line.rpartition("\t")
+        done.add((directory, int(i)))
+    return done
+
+
+__all__ = [
+    "CHECKPOINT_PATH",
+    "ApplyPlanTargetExistsError",
+    "LoadPlanRootError",
+    "MigrationPlan",
+    "Rename",
+    "apply_plan",
+    "compute_renames",
+    "load_plan",
+    "plan_renames",
+]
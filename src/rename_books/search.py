@@ -0,0 +1,294 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from itertools import batched
+from logging import getLogger
+from pathlib import Path
+from re import findall
+from sqlite3 import Connection, connect
+from typing import TYPE_CHECKING, Any, Self
+from unicodedata import combining, normalize
+
+from tabulate import tabulate
+
+from rename_books.classes import AuthorEtAl, MetaData, MetaDataFromPathError
+from rename_books.constants import BOOKS, DATA_PATH
+from rename_books.formats import BOOK_SUFFIXES
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+    from types import TracebackType
+
+
+_LOGGER = getLogger(__name__)
+SEARCH_PATH = DATA_PATH.joinpath("search.sqlite")
+_SEP = "\x1f"
+_BATCH_SIZE = 1_000
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS roots (path TEXT PRIMARY KEY) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    year INTEGER,
+    title TEXT NOT NULL,
+    subtitles TEXT NOT NULL,
+    authors TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_year ON files (year);
+CREATE VIRTUAL TABLE IF NOT EXISTS files_fts USING fts5(
+    title,
+    subtitles,
+    authors,
+    content='files',
+    content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2',
+    prefix='2 3'
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS files_vocab USING fts5vocab(files_fts, 'row');
+CREATE TRIGGER IF NOT EXISTS files_insert AFTER INSERT ON files BEGIN
+    INSERT INTO files_fts (rowid, title, subtitles, authors)
+    VALUES (new.id, new.title, new.subtitles, new.authors);
+END;
+CREATE TRIGGER IF NOT EXISTS files_delete AFTER DELETE ON files BEGIN
+    INSERT INTO files_fts (files_fts, rowid, title, subtitles, authors)
+    VALUES ('delete', old.id, old.title, old.subtitles, old.authors);
+END;
+"""
+
+
+@dataclass(order=True, unsafe_hash=True, kw_only=True, slots=True)
+class SearchHit:
+    """A file matching a search."""
+
+    path: Path
+    year: int | None = None
+    title_and_subtitles: tuple[str, ...] = ()
+    authors: tuple[str, ...] = ()
+
+
+@dataclass(kw_only=True)
+class SearchIndex:
+    """An inverted index of the titles, subtitles and authors of a library.
+
+    Each token matches as a prefix, and also matches the indexed terms within a
+    small edit distance of it; results are ranked by BM25.
+    """
+
+    path: Path = SEARCH_PATH
+    _conn: Connection = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = connect(self.path, check_same_thread=False)
+        _ = self._conn.executescript(_SCHEMA)
+        _ = self._conn.execute("PRAGMA journal_mode = WAL")
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+        /,
+    ) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        (count,) = self._conn.execute("SELECT count(*) FROM files").fetchone()
+        return count
+
+    def add(self, paths: Iterable[Path], /) -> None:
+        """Index a set of files, replacing any existing entries for them."""
+        for batch in batched(paths, _BATCH_SIZE):
+            rows = list(map(_to_row, batch))
+            with self._conn:
+                _ = self._conn.executemany(
+                    "DELETE FROM files WHERE path = ?", [(r[0],) for r in rows]
+                )
+                _ = self._conn.executemany(
+                    """
+                    INSERT INTO files (path, year, title, subtitles, authors)
+                    VALUES (?, ?, ?, ?, ?)
+                    """,
+                    rows,
+                )
+
+    def close(self) -> None:
+        """Close the index."""
+        self._conn.close()
+
+    def remove(self, paths: Iterable[Path], /) -> None:
+        """Remove a set of files from the index."""
+        with self._conn:
+            _ = self._conn.executemany(
+                "DELETE FROM files WHERE path = ?", [(str(p),) for p in paths]
+            )
+
+    def rename(self, source: Path, target: Path, /) -> None:
+        """Update the index after a file has been renamed.
+
+        Only targets under an indexed root are added; files moved into a root
+        by other means are picked up by `sync`.
+        """
+        self.remove([source])
+        roots = [Path(r) for (r,) in self._conn.execute("SELECT path FROM roots")]
+        if any(target.is_relative_to(r) for r in roots):
+            self.add([target])
+
+    def search(
+        self,
+        query: str = "",
+        /,
+        *,
+        year_from: int | None = None,
+        year_to: int | None = None,
+        fuzzy: bool = True,
+        limit: int = 20,
+    ) -> list[SearchHit]:
+        """Get the files matching a query and a range of years, best first."""
+        clauses = ["(? IS NULL OR files.year >= ?)", "(? IS NULL OR files.year <= ?)"]
+        params: list[Any] = [year_from, year_from, year_to, year_to]
+        if len(tokens := _tokenize(query)) >= 1:
+            match = " AND ".join(self._expand(t, fuzzy=fuzzy) for t in tokens)
+            sql = f"""
+                SELECT files.path, files.year, files.title, files.subtitles,
+                    files.authors
+                FROM files_fts JOIN files ON files.id = files_fts.rowid
+                WHERE files_fts MATCH ? AND {" AND ".join(clauses)}
+                ORDER BY bm25(files_fts, 10.0, 3.0, 5.0), files.year DESC
+                LIMIT ?
+            """  # noqa: S608
+            params = [match, *params]
+        else:
+            sql = f"""
+                SELECT path, year, title, subtitles, authors FROM files
+                WHERE {" AND ".join(clauses)}
+                ORDER BY year DESC, path
+                LIMIT ?
+            """  # noqa: S608
+        rows = self._conn.execute(sql, [*params, limit]).fetchall()
+        return list(map(_to_hit, rows))
+
+    def sync(self, root: Path = BOOKS, /) -> tuple[int, int]:
+        """Bring the index up to date with a library, touching only the changes.
+
+        Return the numbers of files added and removed.
+        """
+        with self._conn:
+            _ = self._conn.execute(
+                "INSERT OR IGNORE INTO roots VALUES (?)", (str(root),)
+            )
+        current = {
+            str(p)
+            for p in root.rglob("*")
+            if p.is_file() and (p.suffix in BOOK_SUFFIXES)
+        }
+        indexed = {
+            p
+            for (p,) in self._conn.execute("SELECT path FROM files")
+            if Path(p).is_relative_to(root)
+        }
+        added, removed = sorted(current - indexed), sorted(indexed - current)
+        self.remove(map(Path, removed))
+        self.add(map(Path, added))
+        return len(added), len(removed)
+
+    def _expand(self, token: str, /, *, fuzzy: bool) -> str:
+        """Expand a token into a prefix query, and its near misses."""
+        terms = [f'"{token}"*']
+        if fuzzy and ((distance := _max_distance(token)) >= 1):
+            rows = self._conn.execute(
+                """
+                SELECT term FROM files_vocab
+                WHERE term >= ? AND term < ? AND length(term) BETWEEN ? AND ?
+                """,
+                (
+                    token[0],
+                    chr(ord(token[0]) + 1),
+                    len(token) - distance,
+                    len(token) + distance,
+                ),
+            )
+            terms.extend(
+                f'"{term}"'
+                for (term,) in rows
+                if (term != token) and _is_within(token, term, distance)
+            )
+        return f"({' OR '.join(terms)})"
+
+
+def repr_search_hits(hits: Iterable[SearchHit], /) -> str:
+    """The hits of a search as a table."""
+    rows = [
+        [h.year, " – ".join(h.title_and_subtitles), ", ".join(h.authors), h.path.name]
+        for h in hits
+    ]
+    return tabulate(rows, headers=["year", "title/subtitles", "authors", "file"])
+
+
+def _fold(text: str, /) -> str:
+    decomposed = normalize("NFKD", text.casefold())
+    return "".join(c for c in decomposed if not combining(c))
+
+
+def _is_within(first: str, second: str, distance: int, /) -> bool:
+    """Check if the edit distance between two strings is at most a bound.
+
+    Adjacent transpositions count as a single edit, as in 'tolkein'.
+    """
+    if abs(len(first) - len(second)) > distance:
+        return False
+    before: list[int] = []
+    previous = list(range(len(second) + 1))
+    for i, a in enumerate(first, start=1):
+        current = [i]
+        for j, b in enumerate(second, start=1):
+            cost = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (a != b))
+            if (i >= 2) and (j >= 2) and (a == second[j - 2]) and (first[i - 2] == b):
+                cost = min(cost, before[j - 2] + 1)
+            current.append(cost)
+        if min(current) > distance:
+            return False
+        before, previous = previous, current
+    return previous[-1] <= distance
+
+
+def _max_distance(token: str, /) -> int:
+    if len(token) <= 3:
+        return 0
+    return 1 if len(token) <= 7 else 2
+
+
+def _to_hit(row: tuple[Any, ...], /) -> SearchHit:
+    path, year, title, subtitles, authors = row
+    return SearchHit(
+        path=Path(path),
+        year=year,
+        title_and_subtitles=tuple(
+            t for t in [title, *subtitles.split(_SEP)] if len(t) >= 1
+        ),
+        authors=tuple(a for a in authors.split(_SEP) if len(a) >= 1),
+    )
+
+
+def _to_row(path: Path, /) -> tuple[str, int | None, str, str, str]:
+    try:
+        meta = MetaData.from_path(path)
+    except MetaDataFromPathError:
+        return str(path), None, path.stem, "", ""
+    title, *subtitles = meta.title_and_subtitles or (path.stem,)
+    match meta.authors:
+        case tuple() as authors:
+            pass
+        case AuthorEtAl() as author_et_al:
+            authors = (author_et_al.author,)
+    return str(path), meta.year, title, _SEP.join(subtitles), _SEP.join(authors)
+
+
+def _tokenize(text: str, /) -> list[str]:
+    return findall(r"[^\W_]+", _fold(text))
+
+
+__all__ = ["SEARCH_PATH", "SearchHit", "SearchIndex", "repr_search_hits"]
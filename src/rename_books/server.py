@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import suppress
+from dataclasses import dataclass
+from functools import lru_cache
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import batched, chain
+from json import JSONDecodeError, dumps, loads
+from logging import getLogger
+from socketserver import ThreadingMixIn, UnixStreamServer
+from typing import TYPE_CHECKING, Any, override
+
+from rename_books.lib import normalize_text, parse_text
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from pathlib import Path
+    from socketserver import BaseServer
+
+
+_LOGGER = getLogger(__name__)
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+
+@lru_cache(maxsize=65_536)
+def _parse(text: str, /) -> dict[str, Any] | None:
+    return parse_text(text)
+
+
+@lru_cache(maxsize=65_536)
+def _normalize(text: str, /) -> dict[str, Any]:
+    normalized, status = normalize_text(text)
+    return {"normalized": normalized, "status": status}
+
+
+def _is_normalized(text: str, /) -> bool:
+    return _normalize(text)["status"] == "normalized"
+
+
+_ENDPOINTS: dict[str, Callable[[str], Any]] = {
+    "/parse": _parse,
+    "/normalize": _normalize,
+    "/is-normalized": _is_normalized,
+}
+
+
+def run_batch(endpoint: str, texts: list[str], /) -> list[Any]:
+    """Run an endpoint against a batch of stems, reporting failures per stem."""
+    return [run_one(endpoint, t) for t in texts]
+
+
+def run_one(endpoint: str, text: str, /) -> Any:
+    """Run an endpoint against a stem, reporting a failure as an error entry.
+
+    Nothing escapes, so a failing stem can neither break a worker pool shared
+    across requests nor kill the handling thread before it responds.
+    """
+    try:
+        return _ENDPOINTS[endpoint](text)
+    except Exception as error:
+        _LOGGER.exception("Failed to run %r on %r", endpoint, text)
+        return {"error": f"{type(error).__name__}: {error}"}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "rename-books"
+
+    def do_GET(self) -> None:
+        if self.path == "/health":
+            self._send(HTTPStatus.OK, {"status": "ok"})
+        else:
+            self._send(HTTPStatus.NOT_FOUND, {"error": f"Unknown path {self.path!r}"})
+
+    def do_POST(self) -> None:
+        if self.path not in _ENDPOINTS:
+            self._send(HTTPStatus.NOT_FOUND, {"error": f"Unknown path {self.path!r}"})
+            return
+        if (header := self.headers.get("Content-Length")) is None:
+            self._send(HTTPStatus.LENGTH_REQUIRED, {"error": "Missing Content-Length"})
+            return
+        try:
+            length = int(header)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self._send(
+                HTTPStatus.BAD_REQUEST, {"error": f"Invalid Content-Length {header!r}"}
+            )
+            return
+        try:
+            body = loads(self.rfile.read(length))
+        except JSONDecodeError as error:
+            self._send(HTTPStatus.BAD_REQUEST, {"error": str(error)})
+            return
+        match body:
+            case {"stem": str() as stem}:
+                self._send(HTTPStatus.OK, {"result": run_one(self.path, stem)})
+            case {"stems": list() as stems} if all(isinstance(s, str) for s in stems):
+                results = _get_options(self.server).run(self.path, stems)
+                self._send(HTTPStatus.OK, {"results": results})
+            case _:
+                self._send(
+                    HTTPStatus.BAD_REQUEST,
+                    {"error": "Expected {'stem': str} or {'stems': [str, ...]}"},
+                )
+
+    @override
+    def address_string(self) -> str:
+        match self.client_address:
+            case (str() as host, *_):
+                return host
+            case _:
+                return "unix"
+
+    @override
+    def log_message(self, format: str, *args: Any) -> None:
+        _LOGGER.debug("%s - %s", self.address_string(), format % args)
+
+    def _send(self, status: HTTPStatus, data: Any, /) -> None:
+        body = dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        _ = self.wfile.write(body)
+
+
+@dataclass(kw_only=True, slots=True)
+class _ServerOptions:
+    """The options shared by the handlers of a server."""
+
+    executor: Executor | None = None
+    chunk_size: int = 1_000
+
+    def run(self, endpoint: str, texts: list[str], /) -> list[Any]:
+        """Run an endpoint against a batch, in parallel if it is large."""
+        if (self.executor is None) or (len(texts) <= self.chunk_size):
+            return run_batch(endpoint, texts)
+        chunks = [list(c) for c in batched(texts, self.chunk_size)]
+        results = self.executor.map(run_batch, [endpoint] * len(chunks), chunks)
+        return list(chain.from_iterable(results))
+
+
+class _TCPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], /, *, options: _ServerOptions) -> None:
+        super().__init__(address, _Handler)
+        self.options = options
+
+
+class _UnixServer(ThreadingMixIn, UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: Path, /, *, options: _ServerOptions) -> None:
+        path.unlink(missing_ok=True)
+        super().__init__(str(path), _Handler)
+        self.options = options
+
+
+def _get_options(server: BaseServer, /) -> _ServerOptions:
+    match server:
+        case _TCPServer() | _UnixServer():
+            return server.options
+        case _:
+            raise TypeError(server)
+
+
+def make_server(
+    *,
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    socket: Path | None = None,
+    executor: Executor | None = None,
+    chunk_size: int = 1_000,
+) -> _TCPServer | _UnixServer:
+    """Make a JSON server, over TCP or over a Unix socket."""
+    options = _ServerOptions(executor=executor, chunk_size=chunk_size)
+    if socket is None:
+        return _TCPServer((host, port), options=options)
+    return _UnixServer(socket, options=options)
+
+
+def serve(
+    *,
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    socket: Path | None = None,
+    max_workers: int | None = None,
+    chunk_size: int = 1_000,
+) -> None:
+    """Serve the parser until interrupted."""
+    with (
+        ProcessPoolExecutor(max_workers=max_workers) as executor,
+        make_server(
+            host=host,
+            port=port,
+            socket=socket,
+            executor=executor,
+            chunk_size=chunk_size,
+        ) as server,
+    ):
+        _LOGGER.info("Serving on %r", server.server_address)
+        with suppress(KeyboardInterrupt):
+            server.serve_forever()
+    if socket is not None:
+        socket.unlink(missing_ok=True)
+
+
+__all__ = [
+    "DEFAULT_HOST",
+    "DEFAULT_PORT",
+    "make_server",
+    "run_batch",
+    "run_one",
+    "serve",
+]
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+from contextlib import suppress
+from dataclasses import dataclass, field
+from json import JSONDecodeError, dumps, loads
+from logging import getLogger
+from pathlib import Path
+from typing import Any, Self
+
+from utilities.core import write_text
+
+from rename_books.constants import DATA_PATH
+
+_LOGGER = getLogger(__name__)
+SESSION_PATH = DATA_PATH.joinpath("session.json")
+
+
+@dataclass(kw_only=True)
+class SessionState:
+    """The state of an inbox session, persisted across restarts.
+
+    Skipped files are recorded with their size and modification time, so that
+    files which change after being skipped are offered again.
+    """
+
+    path: Path = SESSION_PATH
+    skips: dict[str, tuple[int, int]] = field(default_factory=dict)
+    position: Path | None = None
+
+    def __contains__(self, path: object, /) -> bool:
+        if not isinstance(path, Path):
+            return False
+        try:
+            version = self.skips[str(path)]
+        except KeyError:
+            return False
+        try:
+            return _get_version(path) == version
+        except FileNotFoundError:
+            return False
+
+    def __len__(self) -> int:
+        return len(self.skips)
+
+    def add_skip(self, path: Path, /) -> None:
+        """Record a skipped file."""
+        self.skips[str(path)] = _get_version(path)
+        self.save()
+
+    @classmethod
+    def load(cls, path: Path = SESSION_PATH, /) -> Self:
+        """Load the session state, if it exists."""
+        with suppress(FileNotFoundError):
+            try:
+                data: dict[str, Any] = loads(path.read_text())
+            except JSONDecodeError:
+                _LOGGER.warning("Ignoring invalid session state %r", str(path))
+            else:
+                position = data.get("position")
+                return cls(
+                    path=path,
+                    skips={k: (s, m) for k, (s, m) in data.get("skips", {}).items()},
+                    position=None if position is None else Path(position),
+                )
+        return cls(path=path)
+
+    def reset(self) -> None:
+        """Forget all skipped files and the queue position."""
+        self.skips.clear()
+        self.position = None
+        self.save()
+
+    def save(self) -> None:
+        """Save the session state."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = {
+            "skips": self.skips,
+            "position": None if self.position is None else str(self.position),
+        }
+        write_text(self.path, dumps(data), overwrite=True)
+
+    def set_position(self, path: Path, /) -> None:
+        """Record the position in the queue."""
+        self.position = path
+        self.save()
+
+
+def _get_version(path: Path, /) -> tuple[int, int]:
+    stat = path.stat()
+    return stat.st_size, stat.st_mtime_ns
+
+
+__all__ = ["SESSION_PATH", "SessionState"]
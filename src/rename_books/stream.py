@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+from collections import deque
+from itertools import batched
+from os import cpu_count
+from typing import TYPE_CHECKING
+
+from rename_books.lib import normalize_text
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+    from concurrent.futures import Executor, Future
+
+
+DEFAULT_CHUNK_SIZE = 1_000
+
+
+def normalize_lines(
+    lines: Iterable[str],
+    /,
+    *,
+    executor: Executor | None = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    window: int | None = None,
+) -> Iterator[str]:
+    """Normalize lines of stems or paths, yielding TSV rows in the input order.
+
+    At most `window` chunks are in flight at once, so memory is bounded however
+    long the input is.
+    """
+    texts = (line.rstrip("\r\n") for line in lines)
+    chunks = (list(c) for c in batched(texts, chunk_size))
+    if executor is None:
+        for chunk in chunks:
+            yield from _normalize_chunk(chunk)
+        return
+    window_use = 2 * (cpu_count() or 1) if window is None else window
+    pending: deque[Future[list[str]]] = deque()
+    for chunk in chunks:
+        pending.append(executor.submit(_normalize_chunk, chunk))
+        if len(pending) >= window_use:
+            yield from pending.popleft().result()
+    while len(pending) >= 1:
+        yield from pending.popleft().result()
+
+
+def _normalize_chunk(texts: list[str], /) -> list[str]:
+    rows: list[str] = []
+    for text in texts:
+        normalized, status = normalize_text(text)
+        rows.append(f"{text}\t{'' if normalized is None else normalized}\t{status}\n")
+    return rows
+
+
+__all__ = ["DEFAULT_CHUNK_SIZE", "normalize_lines"]
@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from contextlib import AbstractContextManager, nullcontext
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from itertools import count
+from json import dumps, loads
+from math import ceil
+from os import getpid
+from threading import Lock, get_ident
+from time import perf_counter, time
+from typing import TYPE_CHECKING, Any, Self, TextIO
+
+from tabulate import tabulate
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Sequence
+    from pathlib import Path
+    from types import TracebackType
+
+
+TRACE_ENV_VAR = "RENAME_BOOKS_TRACE"
+_NULL_SPAN = nullcontext()
+_PARENT: ContextVar[int | None] = ContextVar("_PARENT", default=None)
+
+
+@dataclass(kw_only=True)
+class _Tracer:
+    """A sink for trace events, written as JSON lines."""
+
+    path: Path
+    _file: TextIO = field(init=False, repr=False)
+    _ids: count[int] = field(default_factory=count, init=False, repr=False)
+    _lock: Lock = field(default_factory=Lock, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = self.path.open(mode="a", buffering=1)
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+    def emit(self, event: dict[str, Any], /) -> None:
+        line = dumps(event)
+        with self._lock:
+            _ = self._file.write(f"{line}\n")
+
+    def next_id(self) -> int:
+        with self._lock:
+            return next(self._ids)
+
+
+_tracer: _Tracer | None = None
+
+
+@dataclass(kw_only=True, slots=True)
+class _Span:
+    """A timed span, emitted as a trace event when it exits."""
+
+    tracer: _Tracer
+    name: str
+    attrs: dict[str, Any]
+    id_: int = 0
+    parent: int | None = None
+    start: float = 0.0
+    _counter: float = 0.0
+    _token: Any = None
+
+    def __enter__(self) -> Self:
+        self.id_ = self.tracer.next_id()
+        self.parent = _PARENT.get()
+        self._token = _PARENT.set(self.id_)
+        self.start = time()
+        self._counter = perf_counter()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+        /,
+    ) -> None:
+        duration = perf_counter() - self._counter
+        _PARENT.reset(self._token)
+        event: dict[str, Any] = {
+            "name": self.name,
+            "id": self.id_,
+            "parent": self.parent,
+            "start": self.start,
+            "duration": duration,
+            "pid": getpid(),
+            "thread": get_ident(),
+        }
+        if len(self.attrs) >= 1:
+            event["attrs"] = self.attrs
+        if exc_type is not None:
+            event["error"] = exc_type.__name__
+        self.tracer.emit(event)
+
+
+def disable_tracing() -> None:
+    """Stop writing trace events."""
+    global _tracer  # noqa: PLW0603
+    if _tracer is not None:
+        _tracer.close()
+    _tracer = None
+
+
+def enable_tracing(path: Path, /) -> None:
+    """Start appending trace events to a JSON-lines file."""
+    global _tracer  # noqa: PLW0603
+    disable_tracing()
+    _tracer = _Tracer(path=path)
+
+
+def span(name: str, /, **attrs: Any) -> AbstractContextManager[Any]:
+    """Time a stage of the session; a shared no-op unless tracing is enabled."""
+    if _tracer is None:
+        return _NULL_SPAN
+    return _Span(tracer=_tracer, name=name, attrs=attrs)
+
+
+@dataclass(order=True, kw_only=True, slots=True)
+class StageSummary:
+    """The timings of a stage across a trace."""
+
+    name: str
+    count: int
+    total: float
+    p50: float
+    p90: float
+    p99: float
+    max: float
+
+
+def read_trace(path: Path, /) -> list[dict[str, Any]]:
+    """Read the events in a trace file, ignoring any truncated final line."""
+    with path.open() as fh:
+        return [loads(line) for line in fh if line.endswith("\n")]
+
+
+def summarize_trace(events: Iterable[dict[str, Any]], /) -> list[StageSummary]:
+    """Summarize the durations of each stage in a trace."""
+    durations: defaultdict[str, list[float]] = defaultdict(list)
+    for event in events:
+        durations[event["name"]].append(event["duration"])
+    summaries: list[StageSummary] = []
+    for name, values in durations.items():
+        values.sort()
+        summaries.append(
+            StageSummary(
+                name=name,
+                count=len(values),
+                total=sum(values),
+                p50=_percentile(values, 50),
+                p90=_percentile(values, 90),
+                p99=_percentile(values, 99),
+                max=values[-1],
+            )
+        )
+    return sorted(summaries, key=lambda s: s.total, reverse=True)
+
+
+def repr_trace_summary(summaries: Iterable[StageSummary], /) -> str:
+    """The summary of a trace as a table, with times in milliseconds."""
+    rows = [
+        [
+            s.name,
+            s.count,
+            1e3 * s.total,
+            1e3 * s.p50,
+            1e3 * s.p90,
+            1e3 * s.p99,
+            1e3 * s.max,
+        ]
+        for s in summaries
+    ]
+    return tabulate(
+        rows,
+        headers=["stage", "count", "total", "p50", "p90", "p99", "max"],
+        floatfmt=".3f",
+    )
+
+
+def _percentile(values: Sequence[float], percent: float, /) -> float:
+    """Get a percentile of a sorted sequence, using the nearest rank."""
+    rank = max(ceil(percent / 100 * len(values)), 1)
+    return values[rank - 1]
+
+
+__all__ = [
+    "TRACE_ENV_VAR",
+    "StageSummary",
+    "disable_tracing",
+    "enable_tracing",
+    "read_trace",
+    "repr_trace_summary",
+    "span",
+    "summarize_trace",
+]
@@ -0,0 +1,21 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from pytest import fixture
+
+from rename_books.aliases import AliasStore, set_aliases
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from pathlib import Path
+
+
+@fixture(autouse=True)
+def aliases(*, tmp_path: Path) -> Iterator[None]:
+    """Parse against an empty alias store, rather than the user's own."""
+    set_aliases(AliasStore(path=tmp_path.joinpath("aliases.json")))
+    try:
+        yield
+    finally:
+        set_aliases(None)
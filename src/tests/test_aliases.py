@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from pytest import fixture, mark, param
+
+from rename_books.aliases import AliasStore, alias_key, set_aliases
+from rename_books.classes import AuthorEtAl, StemMetaData
+from rename_books.lib import yield_authors
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from pathlib import Path
+
+
+@fixture
+def store(*, tmp_path: Path) -> Iterator[AliasStore]:
+    store = AliasStore(
+        path=tmp_path.joinpath("aliases.json"),
+        groups=[
+            ["J. R. R. Tolkien", "Tolkien, J. R. R."],
+            ["Ursula K. Le Guin", "Ursula Le Guin"],
+        ],
+    )
+    set_aliases(store)
+    try:
+        yield store
+    finally:
+        set_aliases(None)
+
+
+class TestAliasKey:
+    @mark.parametrize(
+        "name",
+        [
+            param("J. R. R. Tolkien"),
+            param("JRR Tolkien"),
+            param("Tolkien, J.R.R."),
+            param("j r r tolkien"),
+            param("Tolkién, JRR"),
+        ],
+    )
+    def test_main(self, *, name: str) -> None:
+        assert alias_key(name) == "jrr tolkien"
+
+    def test_empty(self) -> None:
+        assert alias_key(" ,. ") == ""
+
+    def test_order_kept(self) -> None:
+        assert alias_key("Li Wei") != alias_key("Wei Li")
+        assert alias_key("Wei, Li") == alias_key("Li Wei")
+
+
+class TestAliasStore:
+    def test_canonicalize(self, *, store: AliasStore) -> None:
+        assert store.canonicalize("JRR Tolkien") == "J. R. R. Tolkien"
+        assert store.canonicalize("Le Guin, Ursula") == "Ursula K. Le Guin"
+        assert store.canonicalize("Unknown") == "Unknown"
+
+    def test_add(self, *, store: AliasStore) -> None:
+        store.add(["Terry Pratchett", "Pratchett, Terry", "Terry Pratchett", "Tolkien"])
+        assert store.canonicalize("terry pratchett") == "Terry Pratchett"
+        assert store.canonicalize("JRR Tolkien") == "J. R. R. Tolkien"
+        assert len(store) == 4
+
+    def test_merge(self, *, store: AliasStore) -> None:
+        store.merge("Ursula K. Le Guin", "Tolkien")
+        store.merge("J.R.R. Tolkien", "Tolkien")
+        assert store.canonicalize("Tolkien") == "J.R.R. Tolkien"
+        assert store.canonicalize("Ursula Le Guin") == "J.R.R. Tolkien"
+        assert len(store) == 1
+
+    def test_save_and_load(self, *, store: AliasStore) -> None:
+        store.save()
+        loaded = AliasStore.load(store.path)
+        assert loaded.groups == store.groups
+        assert loaded.canonicalize("JRR Tolkien") == "J. R. R. Tolkien"
+
+    def test_load_missing(self, *, tmp_path: Path) -> None:
+        assert len(AliasStore.load(tmp_path.joinpath("aliases.json"))) == 0
+
+
+class TestParse:
+    @mark.parametrize(
+        ("text", "expected"),
+        [
+            param("2000 — Title (JRR Tolkien)", ("J. R. R. Tolkien",)),
+            param("Tolkien, J.R.R. - Title (2000)", ("J. R. R. Tolkien",)),
+            param(
+                "2000 — Title (JRR Tolkien, Ursula Le Guin)",
+                ("J. R. R. Tolkien", "Ursula K. Le Guin"),
+            ),
+            param(
+                "2000 — Title (JRR Tolkien et al)",
+                AuthorEtAl(author="J. R. R. Tolkien"),
+            ),
+            param("2000 — Title (Other)", ("Other",)),
+        ],
+    )
+    @mark.usefixtures("store")
+    def test_main(self, *, text: str, expected: tuple[str, ...] | AuthorEtAl) -> None:
+        assert StemMetaData.from_text(text).authors == expected
+
+    def test_not_inverted(self, *, store: AliasStore) -> None:
+        store.add(["Wei Li"])
+        result = StemMetaData.from_text("2000 — Title (Li, Wei)").authors
+        assert result == ("Li", "Wei")
+
+
+class TestYieldAuthors:
+    def test_main(self, *, tmp_path: Path) -> None:
+        for name in [
+            "2000 — Title (JRR Tolkien).pdf",
+            "2001 — Title (A, B).epub",
+            "2002 — Title (C et al).pdf",
+            "notes.txt",
+        ]:
+            tmp_path.joinpath(name).touch()
+        assert list(yield_authors(tmp_path)) == ["JRR Tolkien", "A", "B", "C"]
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+from json import loads
+from typing import TYPE_CHECKING
+
+from rename_books.benchmark import drain, make_inbox, run_benchmark, write_benchmark
+from rename_books.lib import get_next_file
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+
+class TestDrain:
+    def test_main(self, *, tmp_path: Path) -> None:
+        make_inbox(tmp_path, 50)
+        count = drain(tmp_path)
+        assert count >= 1
+        assert get_next_file(path=tmp_path) is None
+
+    def test_limit(self, *, tmp_path: Path) -> None:
+        make_inbox(tmp_path, 50)
+        assert drain(tmp_path, limit=3) == 3
+
+
+class TestMakeInbox:
+    def test_main(self, *, tmp_path: Path) -> None:
+        make_inbox(tmp_path, 100)
+        names = [p.name for p in tmp_path.iterdir()]
+        assert len(names) == 100
+        assert any(name.endswith(".part") for name in names)
+        assert any(name.endswith((".epub", ".pdf")) for name in names)
+
+
+class TestRunBenchmark:
+    def test_main(self, *, tmp_path: Path) -> None:
+        results = run_benchmark(sizes=[10, 20], drain_limit=2, repeats=1)
+        assert [r.n for r in results] == [10, 20]
+        path = tmp_path.joinpath("benchmark.json")
+        write_benchmark(path, results)
+        data = loads(path.read_text())
+        assert len(data["results"]) == 2
+        assert len(data["exponents"]) == 1
+        assert set(data["exponents"][0]) == {
+            "n",
+            "get_next_file",
+            "needs_processing",
+            "drain_per_item",
+        }
+
+    def test_memory(self) -> None:
+        results = run_benchmark(sizes=[10, 20], drain_limit=2, repeats=1, memory=True)
+        assert [r.n for r in results] == [10, 20]
+        assert all(r.drain_items == 2 for r in results)
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+from os import utime
+from typing import TYPE_CHECKING
+
+from pytest import fixture, mark, param
+
+from rename_books.cache import ContentCache, FileIdentity
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from pathlib import Path
+
+
+@fixture
+def cache(*, tmp_path: Path) -> Iterator[ContentCache]:
+    with ContentCache(path=tmp_path.joinpath("cache.sqlite")) as cache:
+        yield cache
+
+
+class TestContentCache:
+    def test_get_and_put(self, *, tmp_path: Path, cache: ContentCache) -> None:
+        path = tmp_path.joinpath("file.pdf")
+        _ = path.write_text("contents")
+        identity = FileIdentity.from_path(path)
+        assert cache.get(identity, "format") is None
+        cache.put(identity, "format", {"suffix": ".pdf"})
+        assert cache.get(identity, "format") == {"suffix": ".pdf"}
+        assert cache.get(identity, "other") is None
+        assert (cache.hits, cache.misses) == (1, 2)
+
+    def test_survives_rename(self, *, tmp_path: Path, cache: ContentCache) -> None:
+        path = tmp_path.joinpath("file.pdf")
+        _ = path.write_text("contents")
+        cache.put(FileIdentity.from_path(path), "format", ".pdf")
+        target = path.rename(tmp_path.joinpath("renamed.pdf"))
+        assert cache.get(FileIdentity.from_path(target), "format") == ".pdf"
+
+    def test_get_many_and_put_many(
+        self, *, tmp_path: Path, cache: ContentCache
+    ) -> None:
+        paths = [tmp_path.joinpath(f"file{i}.pdf") for i in range(1_000)]
+        for path in paths:
+            path.touch()
+        identities = list(map(FileIdentity.from_path, paths))
+        cache.put_many({i: i.inode for i in identities[:500]}, "inode")
+        result = cache.get_many(identities, "inode")
+        assert result == {i: i.inode for i in identities[:500]}
+        assert cache.hit_rate == 0.5
+
+    def test_evict(self, *, tmp_path: Path) -> None:
+        with ContentCache(
+            path=tmp_path.joinpath("cache.sqlite"), max_entries=2
+        ) as cache:
+            identities = [
+                FileIdentity(device=0, inode=i, size=0, mtime_ns=0) for i in range(3)
+            ]
+            cache.put(identities[0], "key", 0)
+            cache.put(identities[1], "key", 1)
+            _ = cache.get(identities[0], "key")
+            cache.put(identities[2], "key", 2)
+            assert len(cache) == 2
+            assert cache.get_many(identities, "key") == {
+                identities[0]: 0,
+                identities[2]: 2,
+            }
+
+    @mark.parametrize(("n", "expected"), [param(5, 5), param(8, 5)])
+    def test_evict_batch(self, *, tmp_path: Path, n: int, expected: int) -> None:
+        with ContentCache(
+            path=tmp_path.joinpath("cache.sqlite"), max_entries=5
+        ) as cache:
+            identities = [
+                FileIdentity(device=0, inode=i, size=0, mtime_ns=0)
+                for i in range(n + 1)
+            ]
+            cache.put_many({i: i.inode for i in identities[:n]}, "key")
+            cache.put(identities[n], "key", n)
+            assert len(cache) == expected
+            assert identities[n] in cache.get_many(identities, "key")
+            (count,) = cache._conn.execute("SELECT count(*) FROM entries").fetchone()
+            assert count == expected
+
+    def test_len_on_replace(self, *, cache: ContentCache) -> None:
+        identity = FileIdentity(device=0, inode=0, size=0, mtime_ns=0)
+        cache.put(identity, "key", 0)
+        cache.put(identity, "key", 1)
+        assert len(cache) == 1
+
+    def test_invalidate(self, *, tmp_path: Path, cache: ContentCache) -> None:
+        path = tmp_path.joinpath("file.pdf")
+        _ = path.write_text("contents")
+        cache.put(FileIdentity.from_path(path), "format", ".pdf")
+        assert cache.invalidate([path]) == 0
+        utime(path, ns=(0, 0))
+        assert cache.invalidate([path]) == 1
+        assert len(cache) == 0
+
+    def test_reopen(self, *, tmp_path: Path) -> None:
+        identity = FileIdentity(device=0, inode=0, size=0, mtime_ns=0)
+        with ContentCache(path=tmp_path.joinpath("cache.sqlite")) as cache:
+            cache.put(identity, "key", "value")
+        with ContentCache(path=tmp_path.joinpath("cache.sqlite")) as cache:
+            assert cache.get(identity, "key") == "value"
@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+from json import dumps
+from typing import TYPE_CHECKING, Any
+
+from pytest import MonkeyPatch, fixture, mark, param
+
+import rename_books.classes
+from rename_books.catalog import Catalog, CatalogEntry, find_isbn, normalize_isbn
+from rename_books.classes import AuthorEtAl, MetaData, StemMetaData
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from pathlib import Path
+
+
+_RECORDS: list[dict[str, Any]] = [
+    {
+        "type": {"key": "/type/edition"},
+        "key": "/books/OL1M",
+        "title": "The Hobbit",
+        "subtitle": "There and Back Again",
+        "publish_date": "September 21, 1937",
+        "authors": [{"key": "/authors/OL1A"}],
+        "isbn_10": ["0-306-40615-2"],
+    },
+    {
+        "type": {"key": "/type/edition"},
+        "key": "/books/OL2M",
+        "title": "The Silmarillion",
+        "publish_date": "1977",
+        "authors": [{"key": "/authors/OL1A"}],
+        "isbn_13": ["9780261102736"],
+    },
+    {
+        "type": {"key": "/type/edition"},
+        "key": "/books/OL3M",
+        "title": "Thinking, Fast and Slow",
+        "publish_date": "2011",
+        "author_name": ["Daniel Kahneman"],
+    },
+    {"type": {"key": "/type/author"}, "key": "/authors/OL1A", "name": "J.R.R. Tolkien"},
+]
+
+
+@fixture
+def catalog(*, tmp_path: Path) -> Iterator[Catalog]:
+    dump = tmp_path.joinpath("dump.txt")
+    _ = dump.write_text(
+        "".join(
+            f"{r['type']['key']}\t{r['key']}\t1\t2020-01-01\t{dumps(r)}\n"
+            for r in _RECORDS
+        )
+    )
+    with Catalog(path=tmp_path.joinpath("catalog.sqlite")) as catalog:
+        assert catalog.import_dump(dump, batch_size=2) == len(_RECORDS)
+        yield catalog
+
+
+class TestCatalog:
+    def test_candidates_isbn(self, *, catalog: Catalog) -> None:
+        result = catalog.candidates("Some Download 978-0-261-10273-6")
+        assert [e.title for e in result] == ["The Silmarillion"]
+
+    def test_candidates_stem(self, *, catalog: Catalog) -> None:
+        result = catalog.candidates("Kahneman - Thinking Fast (2011)")
+        expected = CatalogEntry(
+            title="Thinking, Fast and Slow", year=2011, authors=("Daniel Kahneman",)
+        )
+        assert result == [expected]
+
+    def test_candidates_unparseable(self, *, catalog: Catalog) -> None:
+        result = catalog.candidates("hobbit")
+        assert [e.title for e in result] == ["The Hobbit"]
+
+    def test_lookup(self, *, catalog: Catalog) -> None:
+        stem = StemMetaData(
+            year=1977, title_and_subtitles=("Silmarillion",), authors=("Tolkien",)
+        )
+        result = catalog.lookup(stem)
+        expected = CatalogEntry(
+            title="The Silmarillion", year=1977, authors=("J.R.R. Tolkien",)
+        )
+        assert result == [expected]
+
+    def test_lookup_isbn(self, *, catalog: Catalog) -> None:
+        result = catalog.lookup_isbn("0306406152")
+        expected = CatalogEntry(
+            title="The Hobbit",
+            subtitle="There and Back Again",
+            year=1937,
+            authors=("J.R.R. Tolkien",),
+        )
+        assert result == expected
+
+    def test_lookup_isbn_missing(self, *, catalog: Catalog) -> None:
+        assert catalog.lookup_isbn("9781234567897") is None
+
+    def test_search_or(self, *, catalog: Catalog) -> None:
+        result = catalog.search(title="hobbit silmarillion")
+        assert {e.title for e in result} == {"The Hobbit", "The Silmarillion"}
+
+    def test_search_empty(self, *, catalog: Catalog) -> None:
+        assert catalog.search() == []
+
+
+class TestCatalogEntry:
+    def test_stem_meta_data(self) -> None:
+        entry = CatalogEntry(
+            title="the hobbit", subtitle="there and back again", year=1937
+        )
+        expected = StemMetaData(
+            year=1937, title_and_subtitles=("The Hobbit", "There and Back Again")
+        )
+        assert entry.stem_meta_data == expected
+
+
+class TestProcessCatalog:
+    def test_keeps_year(self, *, monkeypatch: MonkeyPatch) -> None:
+        monkeypatch.setattr(rename_books.classes, "prompt", _first)
+        meta = MetaData(year=2000, title_and_subtitles=("Title",), authors=("A",))
+        candidate = StemMetaData(
+            title_and_subtitles=("The Hobbit",), authors=("J. R. R. Tolkien",)
+        )
+        result = meta.process_catalog([candidate])
+        assert result.year == 2000
+        assert result.title_and_subtitles == ("The Hobbit",)
+
+    def test_keeps_authors(self, *, monkeypatch: MonkeyPatch) -> None:
+        monkeypatch.setattr(rename_books.classes, "prompt", _first)
+        meta = MetaData(year=2000, title_and_subtitles=("Title",), authors=("A",))
+        candidate = StemMetaData(year=1937, title_and_subtitles=("The Hobbit",))
+        result = meta.process_catalog([candidate])
+        assert result.authors == ("A",)
+        assert result.title_and_subtitles == ("The Hobbit",)
+
+    def test_author_et_al(self, *, monkeypatch: MonkeyPatch) -> None:
+        monkeypatch.setattr(rename_books.classes, "prompt", _first)
+        meta = MetaData(year=2000, title_and_subtitles=("Title",), authors=("A",))
+        candidate = StemMetaData(
+            year=1937,
+            title_and_subtitles=("The Hobbit",),
+            authors=AuthorEtAl(author="Tolkien"),
+        )
+        result = meta.process_catalog([candidate])
+        assert result.year == 1937
+        assert result.authors == AuthorEtAl(author="Tolkien")
+
+
+class TestFindISBN:
+    @mark.parametrize(
+        ("text", "expected"),
+        [
+            param("Title 0306406152", "9780306406157"),
+            param("Title 978-0-306-40615-7", "9780306406157"),
+            param("Title 1234567890", None),
+            param("Title", None),
+        ],
+    )
+    def test_main(self, *, text: str, expected: str | None) -> None:
+        assert find_isbn(text) == expected
+
+
+class TestNormalizeISBN:
+    @mark.parametrize(
+        ("isbn", "expected"),
+        [
+            param("0-306-40615-2", "9780306406157"),
+            param("9780306406157", "9780306406157"),
+            param("9780306406158", None),
+            param("foo", None),
+        ],
+    )
+    def test_main(self, *, isbn: str, expected: str | None) -> None:
+        assert normalize_isbn(isbn) == expected
+
+
+def _first(*_: object, **__: object) -> str:
+    return "0"
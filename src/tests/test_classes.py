@@ -1,17 +1,29 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+from contextlib import suppress
+from logging import WARNING
+from pathlib import Path
+from time import perf_counter
 
-from hypothesis import given
-from hypothesis.strategies import DrawFn, composite, sampled_from
-from pytest import mark, param
+from hypothesis import HealthCheck, given, settings
+from hypothesis.strategies import DrawFn, composite, integers, lists, sampled_from
+from pytest import LogCaptureFixture, MonkeyPatch, mark, param, raises
 from utilities.pytest import skipif_ci
 
-from rename_books.classes import AuthorEtAl, MetaData, StemMetaData
+import rename_books.classes
+from rename_books.classes import (
+    AuthorEtAl,
+    MetaData,
+    NamePreview,
+    StemMetaData,
+    StemMetaDataFromTextError,
+    _clean_text,
+)
 from rename_books.constants import BOOKS
+from rename_books.filesystem import MemoryFileSystem
+from rename_books.utilities import clean_text
 
-if TYPE_CHECKING:
-    from pathlib import Path
+_INBOX = Path("/inbox")
 
 
 @composite
@@ -19,6 +31,25 @@ def existing_paths(draw: DrawFn, /) -> Path:
     return draw(sampled_from(list(BOOKS.rglob("**/*.pdf"))))
 
 
+_PIECES = [" ", "\t", "-", " - ", "—", "–", "(", ")", ",", ".", "a", "1", "'", "é"]
+_PREFIXES = ["", "2000 ", "2000 — ", "(2000) ", "(—) ", "Author - "]
+_SUFFIXES = ["", "x", " (2000)", " (Author)", " (Z-Library)", "(", " - "]
+
+
+@composite
+def adversarial_stems(draw: DrawFn, /) -> str:
+    unit = "".join(draw(lists(sampled_from(_PIECES), min_size=1, max_size=6)))
+    body = unit * (draw(integers(500, 2_000)) // len(unit))
+    return f"{draw(sampled_from(_PREFIXES))}{body}{draw(sampled_from(_SUFFIXES))}"
+
+
+def _time_from_text(text: str, /) -> float:
+    start = perf_counter()
+    with suppress(StemMetaDataFromTextError):
+        _ = StemMetaData.from_text(text)
+    return perf_counter() - start
+
+
 class TestFromText:
     @mark.parametrize(
         ("text", "expected", "is_normalized"),
@@ -262,6 +293,36 @@ class TestFromText:
                 False,
                 id="asdf",
             ),
+            param(
+                "2000 — Title (J. R. R. Tolkien)",
+                StemMetaData(
+                    year=2000,
+                    title_and_subtitles=("Title",),
+                    authors=("J. R. R. Tolkien",),
+                ),
+                True,
+                id="Year — Title (A. B. Author)",
+            ),
+            param(
+                "2000 — Title (J. R. R. Tolkien et al)",
+                StemMetaData(
+                    year=2000,
+                    title_and_subtitles=("Title",),
+                    authors=AuthorEtAl(author="J. R. R. Tolkien"),
+                ),
+                True,
+                id="Year — Title (A. B. Author et al)",
+            ),
+            param(
+                "2000 — Title (Author et al.)",
+                StemMetaData(
+                    year=2000,
+                    title_and_subtitles=("Title",),
+                    authors=AuthorEtAl(author="Author"),
+                ),
+                False,
+                id="Year — Title (Author et al.)",
+            ),
         ],
     )
     def test_main(self, *, text: str, expected: MetaData, is_normalized: bool) -> None:
@@ -275,6 +336,54 @@ class TestFromText:
         _ = MetaData.from_path(path)
 
 
+class TestFromTextAdversarial:
+    def test_falls_through(self) -> None:
+        result = StemMetaData.from_text("--draft")
+        assert result == StemMetaData(title_and_subtitles=("Draft",))
+
+    @mark.parametrize("stem", [param(" -c"), param("---")])
+    def test_no_title(self, *, stem: str) -> None:
+        with raises(StemMetaDataFromTextError):
+            _ = StemMetaData.from_text(stem)
+
+    @given(stem=adversarial_stems())
+    @settings(
+        max_examples=200, deadline=None, suppress_health_check=[HealthCheck.too_slow]
+    )
+    def test_fuzz(self, *, stem: str) -> None:
+        assert _time_from_text(stem) <= 0.25
+
+    @mark.parametrize(
+        ("prefix", "unit", "suffix"),
+        [
+            param("a - ", " ", "x", id="authors, spaces"),
+            param("a -", " ", "(", id="authors, spaces, open"),
+            param("(2000) a", " ", "b", id="(year), spaces"),
+            param("a", " - a", " (2000", id="authors, dashes"),
+            param("2000 ", "a (", "", id="year, parentheses"),
+            param("a", " ", "-", id="spaces, dash"),
+            param("x", " (Z-Library)", "", id="z-library"),
+        ],
+    )
+    def test_linear(self, *, prefix: str, unit: str, suffix: str) -> None:
+        small, large = (
+            min(
+                _time_from_text(f"{prefix}{unit * (n // len(unit))}{suffix}")
+                for _ in range(3)
+            )
+            for n in [1_000, 10_000]
+        )
+        assert large <= max(30 * small, 0.01)
+
+    def test_slow_parse_logged(
+        self, *, caplog: LogCaptureFixture, monkeypatch: MonkeyPatch
+    ) -> None:
+        monkeypatch.setattr(rename_books.classes, "SLOW_PARSE_DURATION", 0.0)
+        with caplog.at_level(WARNING, logger="rename_books.classes"):
+            _ = StemMetaData.from_text("2000 — Title (Author)")
+        assert "2000 — Title (Author)" in caplog.text
+
+
 class TestParseTitleAndSubtitles:
     @mark.parametrize(
         ("text", "expected"),
@@ -290,3 +399,86 @@ class TestParseTitleAndSubtitles:
     def test_main(self, *, text: str, expected: tuple[str, ...]) -> None:
         result = StemMetaData._parse_title_and_subtitles(text)
         assert result == expected
+
+
+class TestNamePreview:
+    @mark.parametrize(
+        ("title_and_subtitles", "authors"),
+        [
+            param(("the title",), ("an author",)),
+            param(("the title", "a subtitle"), ("an author",)),
+            param(("the title",), ("first author", "second author")),
+            param(("the title",), AuthorEtAl(author="an author")),
+        ],
+    )
+    def test_matches_name(
+        self,
+        *,
+        title_and_subtitles: tuple[str, ...],
+        authors: tuple[str, ...] | AuthorEtAl,
+    ) -> None:
+        meta = MetaData(
+            directory=_INBOX,
+            year=2000,
+            title_and_subtitles=title_and_subtitles,
+            authors=authors,
+            suffix=".pdf",
+        )
+        preview = NamePreview(meta=meta, filesystem=MemoryFileSystem())
+        assert preview.render() == f"Preview: {meta.name} [ok]"
+
+    def test_overrides(self) -> None:
+        meta = MetaData(
+            directory=_INBOX,
+            year=2000,
+            title_and_subtitles=("Title",),
+            authors=("Author",),
+            suffix=".pdf",
+        )
+        preview = NamePreview(meta=meta, filesystem=MemoryFileSystem())
+        assert preview.render(year=2001) == "Preview: 2001 — Title (Author).pdf [ok]"
+        assert (
+            preview.render(title_and_subtitles=["new", "sub"])
+            == "Preview: 2000 — New – Sub (Author).pdf [ok]"
+        )
+        assert preview.render(year=None) == "Preview: incomplete"
+        assert preview.render(authors=[]) == "Preview: incomplete"
+
+    def test_collision(self) -> None:
+        filesystem = MemoryFileSystem()
+        filesystem.touch(source := _INBOX.joinpath("Author - Title (2000).pdf"))
+        filesystem.touch(_INBOX.joinpath("2001 — Title (Author).pdf"))
+        meta = MetaData.from_path(source, suffix=".pdf")
+        preview = NamePreview(meta=meta, source=source, filesystem=filesystem)
+        assert preview.render() == "Preview: 2000 — Title (Author).pdf [ok]"
+        assert (
+            preview.render(year=2001) == "Preview: 2001 — Title (Author).pdf [exists]"
+        )
+
+    def test_source_is_not_a_collision(self) -> None:
+        filesystem = MemoryFileSystem()
+        filesystem.touch(source := _INBOX.joinpath("2000 — Title (Author).pdf"))
+        meta = MetaData.from_path(source)
+        preview = NamePreview(meta=meta, source=source, filesystem=filesystem)
+        assert preview.render() == "Preview: 2000 — Title (Author).pdf [ok]"
+
+    def test_unchanged_fields_not_recleaned(self, *, monkeypatch: MonkeyPatch) -> None:
+        calls: list[str] = []
+
+        def counting(text: str, /) -> str:
+            calls.append(text)
+            return clean_text(text)
+
+        monkeypatch.setattr(rename_books.classes, "clean_text", counting)
+        _clean_text.cache_clear()
+        meta = MetaData(
+            directory=_INBOX,
+            year=2000,
+            title_and_subtitles=("title",),
+            authors=("author",),
+            suffix=".pdf",
+        )
+        preview = NamePreview(meta=meta, filesystem=MemoryFileSystem())
+        for year in range(2000, 2010):
+            _ = preview.render(year=year)
+        assert sorted(calls) == ["author", "title"]
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+from os import utime
+from typing import TYPE_CHECKING
+
+from rename_books.export import Snapshot, SnapshotRow, export_library
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+
+def _make_library(path: Path, /) -> None:
+    path.joinpath("sub").mkdir(parents=True)
+    for name in [
+        "2000 — Title – Sub1 – Sub2 (Author1, Author2).pdf",
+        "2000 — Other (Author1).epub",
+        "sub/2010 — Third (Author3 et al).pdf",
+        "sub/unparseable.pdf",
+        "sub/notes.txt",
+    ]:
+        _ = path.joinpath(name).write_text(name)
+
+
+class TestExportLibrary:
+    def test_main(self, *, tmp_path: Path) -> None:
+        library, directory = tmp_path.joinpath("library"), tmp_path.joinpath("snap")
+        _make_library(library)
+        snapshot, parsed = export_library(library, directory=directory)
+        assert len(snapshot) == parsed == 4
+        rows = {r.path: r for r in Snapshot.load(directory).rows}
+        assert rows["2000 — Title – Sub1 – Sub2 (Author1, Author2).pdf"] == SnapshotRow(
+            path="2000 — Title – Sub1 – Sub2 (Author1, Author2).pdf",
+            year=2000,
+            title="Title",
+            subtitles=("Sub1", "Sub2"),
+            authors=("Author1", "Author2"),
+            suffix=".pdf",
+            size=len("2000 — Title – Sub1 – Sub2 (Author1, Author2).pdf".encode()),
+            mtime_ns=rows["2000 — Title – Sub1 – Sub2 (Author1, Author2).pdf"].mtime_ns,
+        )
+        third = rows["sub/2010 — Third (Author3 et al).pdf"]
+        assert third.authors == ("Author3",)
+        assert third.et_al
+        unparseable = rows["sub/unparseable.pdf"]
+        assert unparseable.year is None
+        assert unparseable.title == ""
+
+    def test_incremental(self, *, tmp_path: Path) -> None:
+        library, directory = tmp_path.joinpath("library"), tmp_path.joinpath("snap")
+        _make_library(library)
+        _ = export_library(library, directory=directory)
+        _, parsed = export_library(library, directory=directory)
+        assert parsed == 0
+        changed = library.joinpath("2000 — Other (Author1).epub")
+        utime(changed, ns=(0, 0))
+        library.joinpath("sub", "unparseable.pdf").unlink()
+        _ = library.joinpath("2020 — New (Author4).pdf").write_text("new")
+        snapshot, parsed = export_library(library, directory=directory)
+        assert parsed == 2
+        assert len(snapshot) == 4
+        assert sorted(r.path for r in Snapshot.load(directory).rows) == [
+            "2000 — Other (Author1).epub",
+            "2000 — Title – Sub1 – Sub2 (Author1, Author2).pdf",
+            "2020 — New (Author4).pdf",
+            "sub/2010 — Third (Author3 et al).pdf",
+        ]
+
+
+class TestSnapshot:
+    def test_queries(self, *, tmp_path: Path) -> None:
+        library, directory = tmp_path.joinpath("library"), tmp_path.joinpath("snap")
+        _make_library(library)
+        _ = export_library(library, directory=directory)
+        snapshot = Snapshot.load(directory)
+        assert snapshot.count_by_year() == {2000: 2, 2010: 1}
+        assert snapshot.top_authors(1) == [("Author1", 2)]
+
+    def test_round_trip(self, *, tmp_path: Path) -> None:
+        rows = [
+            SnapshotRow(path="a.pdf", year=2000, title="A", authors=("X",), size=1),
+            SnapshotRow(path="b.pdf", suffix=".pdf", mtime_ns=2**62),
+        ]
+        snapshot = Snapshot.from_rows(rows, root=tmp_path)
+        snapshot.save(tmp_path.joinpath("snap"))
+        snapshot.save(tmp_path.joinpath("snap"))
+        loaded = Snapshot.load(tmp_path.joinpath("snap"))
+        assert loaded.root == tmp_path
+        assert list(loaded.rows) == rows
+
+    def test_empty(self, *, tmp_path: Path) -> None:
+        Snapshot.from_rows([], root=tmp_path).save(tmp_path.joinpath("snap"))
+        assert len(Snapshot.load(tmp_path.joinpath("snap"))) == 0
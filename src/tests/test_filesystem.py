@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+from pathlib import Path
+from time import perf_counter
+
+from pytest import MonkeyPatch, mark, param, raises
+
+import rename_books.classes
+from rename_books.benchmark import drain, make_inbox
+from rename_books.classes import MetaData
+from rename_books.filesystem import LocalFileSystem, MemoryFileSystem
+from rename_books.lib import get_next_file, yield_authors
+
+_INBOX = Path("/inbox")
+
+
+class TestLocalFileSystem:
+    def test_main(self, *, tmp_path: Path) -> None:
+        filesystem = LocalFileSystem()
+        source, target = tmp_path.joinpath("a.pdf"), tmp_path.joinpath("b.pdf")
+        filesystem.touch(source)
+        assert filesystem.is_file(source)
+        assert list(filesystem.iterdir(tmp_path)) == [source]
+        filesystem.rename(source, target)
+        assert not filesystem.exists(source)
+        assert list(filesystem.walk_files(tmp_path)) == [target]
+
+
+class TestMemoryFileSystem:
+    def test_main(self) -> None:
+        filesystem = MemoryFileSystem()
+        source, target = _INBOX.joinpath("a.pdf"), _INBOX.joinpath("b.pdf")
+        filesystem.touch(source)
+        assert filesystem.exists(_INBOX)
+        assert not filesystem.is_file(_INBOX)
+        assert filesystem.is_file(source)
+        assert list(filesystem.iterdir(_INBOX)) == [source]
+        filesystem.rename(source, target)
+        assert not filesystem.exists(source)
+        assert list(filesystem.iterdir(_INBOX)) == [target]
+        assert len(filesystem) == 1
+
+    def test_walk_files(self) -> None:
+        filesystem = MemoryFileSystem()
+        paths = {_INBOX.joinpath("a.pdf"), _INBOX.joinpath("x", "y", "b.pdf")}
+        for path in paths:
+            filesystem.touch(path)
+        filesystem.mkdir(_INBOX.joinpath("empty"))
+        assert set(filesystem.walk_files(_INBOX)) == paths
+
+    @mark.parametrize(
+        ("source", "target", "error"),
+        [
+            param("missing.pdf", "b.pdf", FileNotFoundError),
+            param("a.pdf", "missing/b.pdf", FileNotFoundError),
+            param("a.pdf", "a.pdf/b.pdf", NotADirectoryError),
+            param("a.pdf", "dir", IsADirectoryError),
+        ],
+    )
+    def test_rename_errors(
+        self, *, source: str, target: str, error: type[OSError]
+    ) -> None:
+        filesystem = MemoryFileSystem()
+        filesystem.touch(_INBOX.joinpath("a.pdf"))
+        filesystem.mkdir(_INBOX.joinpath("dir"))
+        with raises(error):
+            filesystem.rename(_INBOX.joinpath(source), _INBOX.joinpath(target))
+
+    def test_failures(self, *, monkeypatch: MonkeyPatch) -> None:
+        monkeypatch.setattr(rename_books.classes, "prompt", _accept)
+        source = _INBOX.joinpath("Author - Title (2000).pdf")
+        filesystem = MemoryFileSystem(failures={source: PermissionError(source)})
+        filesystem.touch(source)
+        with raises(PermissionError):
+            MetaData.process(source, filesystem=filesystem)
+        assert filesystem.is_file(source)
+
+    def test_listing_delay(self) -> None:
+        filesystem = MemoryFileSystem(listing_delay=0.05)
+        filesystem.write_bytes(_INBOX.joinpath("a.pdf"), b"%PDF-1.7\n")
+        start = perf_counter()
+        assert get_next_file(path=_INBOX, filesystem=filesystem) is not None
+        assert perf_counter() - start >= 0.05
+
+    def test_large_inbox(self) -> None:
+        filesystem = MemoryFileSystem()
+        make_inbox(_INBOX, 10_000, filesystem=filesystem)
+        assert len(filesystem) == 10_000
+        assert get_next_file(path=_INBOX, filesystem=filesystem) is not None
+
+    def test_drain(self) -> None:
+        filesystem = MemoryFileSystem()
+        make_inbox(_INBOX, 100, filesystem=filesystem)
+        assert drain(_INBOX, filesystem=filesystem) >= 1
+        assert get_next_file(path=_INBOX, filesystem=filesystem) is None
+
+    def test_yield_authors(self) -> None:
+        filesystem = MemoryFileSystem()
+        for name in [
+            "2000 — Title (Author).pdf",
+            "sub/2001 — Other (First, Second).epub",
+            "notes.txt",
+        ]:
+            filesystem.touch(_INBOX.joinpath(name))
+        result = sorted(yield_authors(_INBOX, filesystem=filesystem))
+        assert result == ["Author", "First", "Second"]
+
+
+def _accept(*_: object, **__: object) -> str:
+    return ""
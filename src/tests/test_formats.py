@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from pytest import MonkeyPatch, mark, param
+
+import rename_books.classes
+import rename_books.formats
+from rename_books.cache import ContentCache
+from rename_books.classes import MetaData
+from rename_books.filesystem import MemoryFileSystem
+from rename_books.formats import detect_format, sniff_format
+from rename_books.lib import _needs_processing
+
+_INBOX = Path("/inbox")
+_EPUB = b"PK\x03\x04" + bytes(26) + b"mimetypeapplication/epub+zip" + bytes(8)
+_PDF = b"%PDF-1.7\n" + bytes(64)
+
+
+def _mobi(version: int, /) -> bytes:
+    record = 96
+    head = bytearray(bytes(60) + b"BOOKMOBI" + bytes(10) + record.to_bytes(4))
+    head.extend(bytes(record - len(head)))
+    head.extend(bytes(16) + b"MOBI" + bytes(16) + version.to_bytes(4))
+    return bytes(head)
+
+
+class TestSniffFormat:
+    @mark.parametrize(
+        ("head", "expected"),
+        [
+            param(_PDF, ".pdf", id="pdf"),
+            param(b"junk\r\n%PDF-1.4", ".pdf", id="pdf after junk"),
+            param(_EPUB, ".epub", id="epub"),
+            param(b"PK\x03\x04" + bytes(64), None, id="zip"),
+            param(_mobi(6), ".mobi", id="mobi"),
+            param(_mobi(8), ".azw3", id="azw3"),
+            param(bytes(60) + b"BOOKMOBI", ".mobi", id="mobi truncated"),
+            param(b"AT&TFORM\x00\x00\x00\x00DJVU", ".djvu", id="djvu"),
+            param(b"<!DOCTYPE html>", None, id="html"),
+            param(b"", None, id="empty"),
+        ],
+    )
+    def test_main(self, *, head: bytes, expected: str | None) -> None:
+        assert sniff_format(head) == expected
+
+
+class TestDetectFormat:
+    @mark.parametrize(
+        ("name", "data", "expected"),
+        [
+            param("a.pdf", _PDF, ".pdf"),
+            param("a.jpg", _PDF, ".pdf", id="mislabelled"),
+            param("a.pdf", b"<html></html>", None, id="error page"),
+            param("a.pdf", b"", None, id="empty"),
+            param("a.azw3", _mobi(6), ".azw3", id="hybrid azw3"),
+            param("a.mobi", _mobi(8), ".azw3"),
+        ],
+    )
+    def test_main(self, *, name: str, data: bytes, expected: str | None) -> None:
+        filesystem = MemoryFileSystem()
+        filesystem.write_bytes(path := _INBOX.joinpath(name), data)
+        assert detect_format(path, filesystem=filesystem) == expected
+
+    def test_distinct_filesystems(self) -> None:
+        cases = [(_PDF[:60], ".pdf"), (_EPUB[:60], ".epub"), (_PDF[:60], ".pdf")]
+        for data, expected in cases:
+            filesystem = MemoryFileSystem()
+            filesystem.write_bytes(path := _INBOX.joinpath("a.bin"), data)
+            assert detect_format(path, filesystem=filesystem) == expected
+            del filesystem
+
+    def test_cached_by_identity(self, *, tmp_path: Path) -> None:
+        filesystem = MemoryFileSystem()
+        filesystem.write_bytes(source := _INBOX.joinpath("a.bin"), _PDF)
+        with ContentCache(path=tmp_path.joinpath("cache.sqlite")) as cache:
+            assert detect_format(source, filesystem=filesystem, cache=cache) == ".pdf"
+            filesystem.rename(source, target := _INBOX.joinpath("b.bin"))
+            assert detect_format(target, filesystem=filesystem, cache=cache) == ".pdf"
+            assert (cache.hits, cache.misses) == (0, 1)
+            filesystem.write_bytes(target, _EPUB)
+            assert detect_format(target, filesystem=filesystem, cache=cache) == ".epub"
+            assert len(cache) == 1
+
+    def test_persisted(self, *, tmp_path: Path) -> None:
+        path = tmp_path.joinpath("a.bin")
+        _ = path.write_bytes(_PDF)
+        with ContentCache(path=tmp_path.joinpath("cache.sqlite")) as cache:
+            assert detect_format(path, cache=cache) == ".pdf"
+        rename_books.formats._memo.clear()
+        with ContentCache(path=tmp_path.joinpath("cache.sqlite")) as cache:
+            assert detect_format(path, cache=cache) == ".pdf"
+            assert cache.hits == 1
+
+
+class TestNeedsProcessingByContents:
+    @mark.parametrize(
+        ("name", "data", "expected"),
+        [
+            param("Author - Title (2000).jpg", _PDF, True),
+            param("2000 — Title (Author).jpg", _PDF, True),
+            param("2000 — Title (Author).pdf", _PDF, False),
+            param("Author - Title (2000).pdf", b"<html></html>", False),
+            param("Author - Title (2000).pdf.download", _PDF, False),
+        ],
+    )
+    def test_main(self, *, name: str, data: bytes, expected: bool) -> None:
+        filesystem = MemoryFileSystem()
+        filesystem.write_bytes(path := _INBOX.joinpath(name), data)
+        assert _needs_processing(path, filesystem=filesystem) is expected
+
+    def test_process(self, *, monkeypatch: MonkeyPatch) -> None:
+        monkeypatch.setattr(rename_books.classes, "prompt", _accept)
+        filesystem = MemoryFileSystem()
+        filesystem.write_bytes(
+            path := _INBOX.joinpath("Author - Title (2000).jpg"), _PDF
+        )
+        MetaData.process(path, filesystem=filesystem)
+        assert filesystem.is_file(_INBOX.joinpath("2000 — Title (Author).pdf"))
+
+
+def _accept(*_: object, **__: object) -> str:
+    return ""
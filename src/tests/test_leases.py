@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from json import dumps
+from time import sleep, time
+from typing import TYPE_CHECKING, Any
+
+from pytest import MonkeyPatch, raises
+
+import rename_books.formats
+import rename_books.lib
+from rename_books.cache import ContentCache
+from rename_books.leases import (
+    Lease,
+    LeaseLostError,
+    claim,
+    claim_next_file,
+    get_worker_id,
+    yield_renewing,
+)
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+
+_PDF = b"%PDF-1.7\n"
+
+
+class TestClaim:
+    def test_main(self, *, tmp_path: Path) -> None:
+        path = tmp_path.joinpath("foo.pdf")
+        _ = path.write_bytes(_PDF)
+        lease = claim(path, worker="a")
+        assert lease is not None
+        assert lease.is_held
+        assert claim(path, worker="b") is None
+        assert claim(path, worker="a") == lease
+        lease.release()
+        assert not lease.is_held
+        assert claim(path, worker="b") is not None
+
+    def test_expired(self, *, tmp_path: Path) -> None:
+        path = tmp_path.joinpath("foo.pdf")
+        _ = path.write_bytes(_PDF)
+        stale = claim(path, worker="a", duration=-1.0)
+        assert stale is not None
+        lease = claim(path, worker="b")
+        assert lease is not None
+        assert lease.is_held
+        assert not stale.is_held
+        stale.release()
+        assert lease.is_held
+
+    def test_being_written(self, *, tmp_path: Path) -> None:
+        path = tmp_path.joinpath("foo.pdf")
+        _ = path.write_bytes(_PDF)
+        lease = Lease(path=path, worker="a", expires=time())
+        lease.lease_path.parent.mkdir()
+        lease.lease_path.touch()
+        assert claim(path, worker="b") is None
+
+    def test_conflicted_copy(self, *, tmp_path: Path) -> None:
+        path = tmp_path.joinpath("foo.pdf")
+        _ = path.write_bytes(_PDF)
+        lease = claim(path, worker="b")
+        assert lease is not None
+        copy = lease.lease_path.with_name(
+            f"{lease.lease_path.stem} (conflicted copy).lease"
+        )
+        _ = copy.write_text(dumps({"worker": "a", "expires": time() + 60.0}))
+        assert not lease.is_held
+
+
+class TestRenew:
+    def test_lost(self, *, tmp_path: Path) -> None:
+        path = tmp_path.joinpath("foo.pdf")
+        _ = path.write_bytes(_PDF)
+        a = claim(path, worker="a", duration=-1.0)
+        assert a is not None
+        b = claim(path, worker="b")
+        assert b is not None
+        with raises(LeaseLostError):
+            a.renew()
+        assert b.is_held
+        assert not a.is_held
+
+
+class TestClaimNextFile:
+    def test_main(self, *, tmp_path: Path) -> None:
+        for name in ["a.pdf", "b.pdf"]:
+            _ = tmp_path.joinpath(name).write_bytes(_PDF)
+        first = claim_next_file(path=tmp_path, worker="x")
+        second = claim_next_file(path=tmp_path, worker="y")
+        assert first is not None
+        assert second is not None
+        assert first.path == tmp_path.joinpath("a.pdf")
+        assert second.path == tmp_path.joinpath("b.pdf")
+        assert claim_next_file(path=tmp_path, worker="z") is None
+
+    def test_cache(self, *, tmp_path: Path) -> None:
+        inbox = tmp_path.joinpath("inbox")
+        inbox.mkdir()
+        _ = inbox.joinpath("a.pdf").write_bytes(_PDF)
+        with ContentCache(path=tmp_path.joinpath("cache.sqlite")) as cache:
+            lease = claim_next_file(path=inbox, worker="x", cache=cache)
+            assert lease is not None
+            lease.release()
+        rename_books.formats._memo.clear()
+        with ContentCache(path=tmp_path.joinpath("cache.sqlite")) as cache:
+            assert claim_next_file(path=inbox, worker="x", cache=cache) is not None
+            assert cache.hits == 1
+
+    def test_all_held_scans_once(
+        self, *, tmp_path: Path, monkeypatch: MonkeyPatch
+    ) -> None:
+        n = 20
+        for i in range(n):
+            path = tmp_path.joinpath(f"Author - Title {i} (2000).pdf")
+            _ = path.write_bytes(_PDF)
+            _ = claim(path, worker="other")
+        checked: list[Path] = []
+        needs_processing = rename_books.lib._needs_processing
+
+        def counting(path: Path, /, **kwargs: Any) -> bool:
+            checked.append(path)
+            return needs_processing(path, **kwargs)
+
+        monkeypatch.setattr(rename_books.lib, "_needs_processing", counting)
+        assert claim_next_file(path=tmp_path, worker="x") is None
+        assert sorted(checked) == sorted(tmp_path.iterdir())
+
+    def test_parallel(self, *, tmp_path: Path) -> None:
+        n = 50
+        for i in range(n):
+            _ = tmp_path.joinpath(f"Author - Title {i} (2000).pdf").write_bytes(_PDF)
+
+        def work(worker: str, /) -> list[str]:
+            processed: list[str] = []
+            while (lease := claim_next_file(path=tmp_path, worker=worker)) is not None:
+                with yield_renewing(lease):
+                    processed.append(lease.path.name)
+                    name = lease.path.name.replace("Author - ", "2000 — ")
+                    name = name.replace(" (2000)", " (Author)")
+                    _ = lease.path.rename(tmp_path.joinpath(name))
+            return processed
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            results = list(pool.map(work, ["a", "b", "c", "d"]))
+        processed = [name for result in results for name in result]
+        assert len(processed) == len(set(processed)) == n
+
+
+class TestGetWorkerId:
+    def test_main(self) -> None:
+        assert isinstance(get_worker_id(), str)
+
+
+class TestYieldRenewing:
+    def test_main(self, *, tmp_path: Path) -> None:
+        path = tmp_path.joinpath("foo.pdf")
+        _ = path.write_bytes(_PDF)
+        lease = claim(path, worker="a", duration=1.0)
+        assert lease is not None
+        with yield_renewing(lease, interval=0.01, duration=60.0):
+            while lease.expires - time() < 30.0:
+                pass
+            assert lease.is_held
+        assert not lease.lease_path.exists()
+
+    def test_lost(self, *, tmp_path: Path) -> None:
+        path = tmp_path.joinpath("foo.pdf")
+        _ = path.write_bytes(_PDF)
+        lease = claim(path, worker="a", duration=-1.0)
+        assert lease is not None
+        other = claim(path, worker="b")
+        assert other is not None
+        with raises(LeaseLostError), yield_renewing(lease, interval=0.01):
+            sleep(0.1)
+        assert other.is_held
@@ -1,16 +1,33 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any
 
 from pytest import mark, param
 
-from rename_books.lib import _needs_processing
+import rename_books.formats
+from rename_books.cache import ContentCache
+from rename_books.lib import (
+    _needs_processing,
+    get_next_file,
+    normalize_text,
+    parse_text,
+)
 from rename_books.utilities import clean_text
 
 if TYPE_CHECKING:
     from pathlib import Path
 
 
+_HEADERS = {
+    ".epub": b"PK\x03\x04" + bytes(26) + b"mimetypeapplication/epub+zip",
+    ".pdf": b"%PDF-1.7\n",
+}
+
+
+def _write(path: Path, /) -> None:
+    _ = path.write_bytes(_HEADERS.get(path.suffix, b""))
+
+
 class TestCleanText:
     @mark.parametrize(
         ("text", "expected"),
@@ -25,6 +42,47 @@ class TestCleanText:
         assert clean_text(text) == expected
 
 
+class TestGetNextFile:
+    def test_main(self, *, tmp_path: Path) -> None:
+        for name in ["b.pdf", "a.epub", "2000 — Title (Author).pdf", "c.jpg"]:
+            _write(tmp_path.joinpath(name))
+        assert get_next_file(path=tmp_path) == tmp_path.joinpath("a.epub")
+
+    def test_skips(self, *, tmp_path: Path) -> None:
+        a, b = tmp_path.joinpath("a.pdf"), tmp_path.joinpath("b.pdf")
+        _write(a)
+        _write(b)
+        assert get_next_file(path=tmp_path, skips={a}) == b
+        assert get_next_file(path=tmp_path, skips={a, b}) is None
+
+    def test_cache(self, *, tmp_path: Path) -> None:
+        inbox = tmp_path.joinpath("inbox")
+        inbox.mkdir()
+        _write(path := inbox.joinpath("a.pdf"))
+        with ContentCache(path=tmp_path.joinpath("cache.sqlite")) as cache:
+            assert get_next_file(path=inbox, cache=cache) == path
+            assert (cache.hits, cache.misses) == (0, 1)
+        rename_books.formats._memo.clear()
+        with ContentCache(path=tmp_path.joinpath("cache.sqlite")) as cache:
+            assert get_next_file(path=inbox, cache=cache) == path
+            assert (cache.hits, cache.misses) == (1, 0)
+
+    @mark.parametrize(
+        ("start", "expected"),
+        [
+            param("a.pdf", "a.pdf"),
+            param("b.pdf", "c.pdf"),
+            param("c.pdf", "c.pdf"),
+            param("d.pdf", "a.pdf"),
+        ],
+    )
+    def test_start(self, *, tmp_path: Path, start: str, expected: str) -> None:
+        for name in ["a.pdf", "c.pdf"]:
+            _write(tmp_path.joinpath(name))
+        result = get_next_file(path=tmp_path, start=tmp_path.joinpath(start))
+        assert result == tmp_path.joinpath(expected)
+
+
 class TestNeedsProcessing:
     @mark.parametrize(
         ("name", "expected"),
@@ -46,6 +104,52 @@ class TestNeedsProcessing:
     )
     def test_main(self, *, tmp_path: Path, name: str, expected: bool) -> None:
         path = tmp_path.joinpath(name)
-        path.touch()
+        _write(path)
         result = _needs_processing(path)
         assert result is expected
+
+
+class TestNormalizeText:
+    @mark.parametrize(
+        ("text", "expected"),
+        [
+            param("2000 — Title (Author)", ("2000 — Title (Author)", "normalized")),
+            param("Author - Title (2000)", ("2000 — Title (Author)", "changed")),
+            param(
+                "dir/Author - Title (2000).pdf",
+                ("dir/2000 — Title (Author).pdf", "changed"),
+            ),
+            param("Title", (None, "error")),
+        ],
+    )
+    def test_main(self, *, text: str, expected: tuple[str | None, str]) -> None:
+        assert normalize_text(text) == expected
+
+
+class TestParseText:
+    @mark.parametrize(
+        ("text", "expected"),
+        [
+            param(
+                "Author - Title (2000).epub",
+                {
+                    "year": 2000,
+                    "title_and_subtitles": ["Title"],
+                    "authors": ["Author"],
+                    "et_al": False,
+                },
+            ),
+            param(
+                "2000 — Title (Author et al)",
+                {
+                    "year": 2000,
+                    "title_and_subtitles": ["Title"],
+                    "authors": ["Author"],
+                    "et_al": True,
+                },
+            ),
+            param("Title", None),
+        ],
+    )
+    def test_main(self, *, text: str, expected: dict[str, Any] | None) -> None:
+        assert parse_text(text) == expected
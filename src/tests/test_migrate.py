@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from pytest import raises
+
+from rename_books.migrate import (
+    ApplyPlanTargetExistsError,
+    LoadPlanRootError,
+    MigrationPlan,
+    Rename,
+    apply_plan,
+    compute_renames,
+    load_plan,
+    plan_renames,
+)
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+
+def _touch(path: Path, *names: str) -> list[Path]:
+    paths = [path.joinpath(n) for n in names]
+    for p, n in zip(paths, names, strict=True):
+        _ = p.write_text(n)
+    return paths
+
+
+class TestApplyPlan:
+    def test_cycle(self, *, tmp_path: Path) -> None:
+        a, b, c = _touch(tmp_path, "a", "b", "c")
+        plan = plan_renames([
+            Rename(source=a, target=b),
+            Rename(source=b, target=c),
+            Rename(source=c, target=a),
+        ])
+        checkpoint = tmp_path.joinpath("checkpoint", "migrate.json")
+        apply_plan(plan, checkpoint=checkpoint)
+        assert [p.read_text() for p in [a, b, c]] == ["c", "a", "b"]
+        assert not checkpoint.exists()
+
+    def test_resume(self, *, tmp_path: Path) -> None:
+        a, b = _touch(tmp_path, "a", "b")
+        plan = plan_renames([Rename(source=a, target=b), Rename(source=b, target=a)])
+        checkpoint = tmp_path.joinpath("migrate.json")
+        _ = checkpoint.write_text(plan.to_json)
+        first = plan.steps[tmp_path][0]
+        _ = first.source.rename(first.target)
+        _ = tmp_path.joinpath("migrate.json.done").write_text(f"{tmp_path}\t0\n")
+        loaded = load_plan(checkpoint)
+        assert loaded == plan
+        apply_plan(plan, checkpoint=checkpoint)
+        assert [p.read_text() for p in [a, b]] == ["b", "a"]
+        assert load_plan(checkpoint) is None
+
+    def test_root_mismatch(self, *, tmp_path: Path) -> None:
+        a, b = _touch(tmp_path, "a", "b")
+        plan = plan_renames([Rename(source=a, target=b)], root=tmp_path)
+        checkpoint = tmp_path.joinpath("migrate.json")
+        _ = checkpoint.write_text(plan.to_json)
+        assert load_plan(checkpoint, root=tmp_path) == plan
+        with raises(LoadPlanRootError):
+            _ = load_plan(checkpoint, root=tmp_path.joinpath("other"))
+
+    def test_error(self, *, tmp_path: Path) -> None:
+        a, b = _touch(tmp_path, "a", "b")
+        plan = MigrationPlan(steps={tmp_path: [Rename(source=a, target=b)]})
+        with raises(ApplyPlanTargetExistsError):
+            apply_plan(plan, checkpoint=tmp_path.joinpath("migrate.json"))
+
+
+class TestComputeRenames:
+    def test_main(self, *, tmp_path: Path) -> None:
+        _ = _touch(
+            tmp_path,
+            "2000 — Title (Author).pdf",
+            "Author - Title (2000).epub",
+            "unparseable.pdf",
+            "--draft.pdf",
+            "other.jpg",
+        )
+        result = compute_renames(tmp_path, max_workers=1)
+        expected = [
+            Rename(
+                source=tmp_path.joinpath("Author - Title (2000).epub"),
+                target=tmp_path.joinpath("2000 — Title (Author).epub"),
+            )
+        ]
+        assert result == expected
+
+
+class TestMigrationPlan:
+    def test_json(self, *, tmp_path: Path) -> None:
+        a, b = tmp_path.joinpath("a"), tmp_path.joinpath("b")
+        plan = MigrationPlan(
+            steps={tmp_path: [Rename(source=a, target=b)]},
+            conflicts=[Rename(source=b, target=a)],
+            root=tmp_path,
+        )
+        assert MigrationPlan.from_json(plan.to_json) == plan
+
+
+class TestPlanRenames:
+    def test_chain(self, *, tmp_path: Path) -> None:
+        a, b, c = tmp_path.joinpath("a"), tmp_path.joinpath("b"), tmp_path.joinpath("c")
+        _ = _touch(tmp_path, "a", "b")
+        plan = plan_renames([Rename(source=a, target=b), Rename(source=b, target=c)])
+        expected = [Rename(source=b, target=c), Rename(source=a, target=b)]
+        assert plan.steps == {tmp_path: expected}
+        assert plan.conflicts == []
+
+    def test_cycle(self, *, tmp_path: Path) -> None:
+        a, b = _touch(tmp_path, "a", "b")
+        plan = plan_renames([Rename(source=a, target=b), Rename(source=b, target=a)])
+        temp = tmp_path.joinpath(".a.migrating")
+        expected = [
+            Rename(source=a, target=temp),
+            Rename(source=b, target=a),
+            Rename(source=temp, target=b),
+        ]
+        assert plan.steps == {tmp_path: expected}
+
+    def test_conflict_duplicate_targets(self, *, tmp_path: Path) -> None:
+        a, b = _touch(tmp_path, "a", "b")
+        c = tmp_path.joinpath("c")
+        renames = [Rename(source=a, target=c), Rename(source=b, target=c)]
+        plan = plan_renames(renames)
+        assert plan.steps == {}
+        assert plan.conflicts == renames
+
+    def test_conflict_existing_target(self, *, tmp_path: Path) -> None:
+        a, b, c = _touch(tmp_path, "a", "b", "c")
+        renames = [Rename(source=a, target=b), Rename(source=b, target=c)]
+        plan = plan_renames(renames)
+        assert plan.steps == {}
+        assert plan.conflicts == renames
@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from pytest import MonkeyPatch, fixture, mark, param
+
+import rename_books.classes
+from rename_books.classes import MetaData
+from rename_books.search import SearchIndex, _is_within, repr_search_hits
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from pathlib import Path
+
+
+_NAMES = [
+    "1937 — The Hobbit (JRR Tolkien).pdf",
+    "1954 — The Fellowship of the Ring – The Lord of the Rings (JRR Tolkien).epub",
+    "1969 — The Left Hand of Darkness (Ursula K. Le Guin).pdf",
+    "2011 — Thinking, Fast and Slow (Daniel Kahneman).pdf",
+    "unparseable notes.pdf",
+]
+
+
+@fixture
+def library(*, tmp_path: Path) -> Path:
+    root = tmp_path.joinpath("library")
+    root.joinpath("sub").mkdir(parents=True)
+    for i, name in enumerate(_NAMES):
+        root.joinpath("sub" if i % 2 else "", name).touch()
+    root.joinpath("ignored.txt").touch()
+    return root
+
+
+@fixture
+def index(*, tmp_path: Path, library: Path) -> Iterator[SearchIndex]:
+    with SearchIndex(path=tmp_path.joinpath("search.sqlite")) as index:
+        _ = index.sync(library)
+        yield index
+
+
+class TestIsWithin:
+    @mark.parametrize(
+        ("first", "second", "distance", "expected"),
+        [
+            param("tolkien", "tolkien", 0, True),
+            param("tolkein", "tolkien", 1, True),
+            param("tolkein", "tolkien", 0, False),
+            param("tlokein", "tolkien", 1, False),
+            param("hobit", "hobbit", 1, True),
+            param("hobbit", "rabbit", 1, False),
+            param("abc", "abcdef", 2, False),
+        ],
+    )
+    def test_main(
+        self, *, first: str, second: str, distance: int, expected: bool
+    ) -> None:
+        assert _is_within(first, second, distance) is expected
+
+
+class TestSearchIndex:
+    @mark.parametrize(
+        ("query", "expected"),
+        [
+            param("hobbit", "1937 — The Hobbit (JRR Tolkien).pdf", id="exact"),
+            param("HOBB", "1937 — The Hobbit (JRR Tolkien).pdf", id="prefix"),
+            param("hobit", "1937 — The Hobbit (JRR Tolkien).pdf", id="fuzzy"),
+            param(
+                "tolkein hobbit",
+                "1937 — The Hobbit (JRR Tolkien).pdf",
+                id="transposition",
+            ),
+            param(
+                "darkness le guin",
+                "1969 — The Left Hand of Darkness (Ursula K. Le Guin).pdf",
+                id="title and authors",
+            ),
+            param(
+                "lord rings",
+                "1954 — The Fellowship of the Ring – The Lord of the Rings (JRR Tolkien).epub",
+                id="subtitles",
+            ),
+            param("kähneman", "2011 — Thinking, Fast and Slow (Daniel Kahneman).pdf"),
+            param("notes", "unparseable notes.pdf", id="unparseable"),
+        ],
+    )
+    def test_search(self, *, index: SearchIndex, query: str, expected: str) -> None:
+        (hit, *_) = index.search(query)
+        assert hit.path.name == expected
+
+    def test_fields(self, *, index: SearchIndex) -> None:
+        (hit,) = index.search("fellowship")
+        assert hit.year == 1954
+        assert hit.title_and_subtitles == (
+            "The Fellowship of the Ring",
+            "The Lord of the Rings",
+        )
+        assert hit.authors == ("JRR Tolkien",)
+
+    def test_ranking(self, *, index: SearchIndex) -> None:
+        names = [h.path.name for h in index.search("tolkien")]
+        assert len(names) == 2
+        assert names[0].startswith("1937")
+
+    def test_repr(self, *, index: SearchIndex) -> None:
+        result = repr_search_hits(index.search("hobbit"))
+        assert "The Hobbit" in result
+        assert "JRR Tolkien" in result
+
+    def test_no_fuzzy(self, *, index: SearchIndex) -> None:
+        assert index.search("hobit", fuzzy=False) == []
+
+    def test_years(self, *, index: SearchIndex) -> None:
+        hits = index.search(year_from=1950, year_to=1970)
+        assert [h.year for h in hits] == [1969, 1954]
+        assert {h.year for h in index.search("the", year_to=1960)} == {1937, 1954}
+
+    def test_sync(self, *, index: SearchIndex, library: Path) -> None:
+        assert len(index) == 5
+        assert index.sync(library) == (0, 0)
+        library.joinpath("1937 — The Hobbit (JRR Tolkien).pdf").unlink()
+        library.joinpath("2020 — New (Author).pdf").touch()
+        assert index.sync(library) == (1, 1)
+        assert index.search("hobbit") == []
+        assert len(index.search("new")) == 1
+
+    def test_rename(self, *, index: SearchIndex, library: Path) -> None:
+        source = library.joinpath("unparseable notes.pdf")
+        target = library.joinpath("2000 — Notes (Author).pdf")
+        _ = source.rename(target)
+        index.rename(source, target)
+        (hit,) = index.search("notes")
+        assert hit.path == target
+        assert hit.year == 2000
+
+    def test_rename_outside(self, *, index: SearchIndex, tmp_path: Path) -> None:
+        source, target = tmp_path.joinpath("a.pdf"), tmp_path.joinpath("b.pdf")
+        index.rename(source, target)
+        assert len(index) == 5
+
+    def test_process(
+        self, *, index: SearchIndex, library: Path, monkeypatch: MonkeyPatch
+    ) -> None:
+        source = library.joinpath("Author - Title (2000).pdf")
+        source.touch()
+        index.add([source])
+        monkeypatch.setattr(rename_books.classes, "prompt", _accept)
+        MetaData.process(source, on_rename=index.rename)
+        (hit,) = index.search("title")
+        assert hit.path == library.joinpath("2000 — Title (Author).pdf")
+
+
+def _accept(*_: object, **__: object) -> str:
+    return ""
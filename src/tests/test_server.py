@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from http.client import HTTPConnection
+from json import dumps, loads
+from socket import AF_UNIX, SOCK_STREAM, socket
+from threading import Thread
+from typing import TYPE_CHECKING, Any, override
+
+from pytest import MonkeyPatch, fixture, mark, param
+
+import rename_books.server
+from rename_books.server import _TCPServer, make_server, run_batch
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from pathlib import Path
+
+
+class _UnixHTTPConnection(HTTPConnection):
+    def __init__(self, path: Path, /) -> None:
+        super().__init__("localhost")
+        self._path = path
+
+    @override
+    def connect(self) -> None:
+        self.sock = socket(AF_UNIX, SOCK_STREAM)
+        _ = self.sock.connect(str(self._path))
+
+
+def _request(
+    conn: HTTPConnection, method: str, path: str, body: Any = None, /
+) -> tuple[int, Any]:
+    conn.request(method, path, body=None if body is None else dumps(body))
+    response = conn.getresponse()
+    return response.status, loads(response.read())
+
+
+@fixture
+def server() -> Iterator[_TCPServer]:
+    with (
+        ProcessPoolExecutor(max_workers=2) as executor,
+        make_server(port=0, executor=executor, chunk_size=2) as server,
+    ):
+        assert isinstance(server, _TCPServer)
+        thread = Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        yield server
+        server.shutdown()
+        thread.join()
+
+
+def _connect(server: _TCPServer, /) -> HTTPConnection:
+    host, port, *_ = server.server_address
+    return HTTPConnection(str(host), port)
+
+
+class TestServer:
+    def test_health(self, *, server: _TCPServer) -> None:
+        status, data = _request(_connect(server), "GET", "/health")
+        assert status == 200
+        assert data == {"status": "ok"}
+
+    @mark.parametrize(
+        ("endpoint", "expected"),
+        [
+            param(
+                "/parse",
+                {
+                    "year": 2000,
+                    "title_and_subtitles": ["Title"],
+                    "authors": ["Author"],
+                    "et_al": False,
+                },
+            ),
+            param(
+                "/normalize",
+                {"normalized": "2000 — Title (Author)", "status": "changed"},
+            ),
+            param("/is-normalized", False),
+        ],
+    )
+    def test_single(self, *, server: _TCPServer, endpoint: str, expected: Any) -> None:
+        status, data = _request(
+            _connect(server), "POST", endpoint, {"stem": "Author - Title (2000)"}
+        )
+        assert status == 200
+        assert data == {"result": expected}
+
+    def test_batch(self, *, server: _TCPServer) -> None:
+        stems = [f"2000 — Title {i} (Author)" for i in range(5)] + ["invalid"]
+        status, data = _request(
+            _connect(server), "POST", "/is-normalized", {"stems": stems}
+        )
+        assert status == 200
+        assert data == {"results": [True] * 5 + [False]}
+
+    @mark.parametrize(
+        ("method", "path", "body", "expected"),
+        [
+            param("GET", "/foo", None, 404),
+            param("POST", "/foo", {"stem": "foo"}, 404),
+            param("POST", "/parse", {"foo": "bar"}, 400),
+            param("POST", "/parse", {"stems": [1, 2]}, 400),
+        ],
+    )
+    def test_error(
+        self, *, server: _TCPServer, method: str, path: str, body: Any, expected: int
+    ) -> None:
+        status, data = _request(_connect(server), method, path, body)
+        assert status == expected
+        assert "error" in data
+
+    @mark.parametrize(
+        ("length", "expected"), [param(None, 411), param("foo", 400), param("-1", 400)]
+    )
+    def test_content_length(
+        self, *, server: _TCPServer, length: str | None, expected: int
+    ) -> None:
+        conn = _connect(server)
+        conn.putrequest("POST", "/parse")
+        if length is not None:
+            conn.putheader("Content-Length", length)
+        conn.endheaders()
+        response = conn.getresponse()
+        assert response.status == expected
+        assert "error" in loads(response.read())
+
+    def test_failing_stem(
+        self, *, server: _TCPServer, monkeypatch: MonkeyPatch
+    ) -> None:
+        monkeypatch.setitem(rename_books.server._ENDPOINTS, "/parse", _fail)
+        status, data = _request(_connect(server), "POST", "/parse", {"stem": "bad"})
+        assert status == 200
+        assert data == {"result": {"error": "ValueError: bad"}}
+        assert run_batch("/parse", ["bad", "bad"]) == [{"error": "ValueError: bad"}] * 2
+
+    def test_unparseable_batch(self, *, server: _TCPServer) -> None:
+        stems = ["--draft", " -c", "---", "Author - Title (2000)"] * 2
+        for _ in range(2):
+            status, data = _request(
+                _connect(server), "POST", "/normalize", {"stems": stems}
+            )
+            assert status == 200
+            assert [r["status"] for r in data["results"]] == [
+                "error",
+                "error",
+                "error",
+                "changed",
+            ] * 2
+
+    def test_unix_socket(self, *, tmp_path: Path) -> None:
+        path = tmp_path.joinpath("server.sock")
+        with make_server(socket=path) as server:
+            thread = Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            status, data = _request(
+                _UnixHTTPConnection(path),
+                "POST",
+                "/normalize",
+                {"stems": ["2000 — Title (Author)"]},
+            )
+            server.shutdown()
+            thread.join()
+        assert status == 200
+        assert data == {
+            "results": [{"normalized": "2000 — Title (Author)", "status": "normalized"}]
+        }
+
+
+def _fail(text: str, /) -> Any:
+    raise ValueError(text)
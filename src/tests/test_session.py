@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+from os import utime
+from typing import TYPE_CHECKING
+
+from rename_books.lib import get_next_file
+from rename_books.session import SessionState
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+
+_PDF = b"%PDF-1.7\n"
+
+
+class TestSessionState:
+    def test_add_skip(self, *, tmp_path: Path) -> None:
+        path = tmp_path.joinpath("foo.pdf")
+        _ = path.write_bytes(_PDF)
+        state = SessionState.load(tmp_path.joinpath("session.json"))
+        assert path not in state
+        state.add_skip(path)
+        assert path in state
+        loaded = SessionState.load(tmp_path.joinpath("session.json"))
+        assert path in loaded
+        assert len(loaded) == 1
+
+    def test_changed_file(self, *, tmp_path: Path) -> None:
+        path = tmp_path.joinpath("foo.pdf")
+        _ = path.write_bytes(_PDF)
+        state = SessionState(path=tmp_path.joinpath("session.json"))
+        state.add_skip(path)
+        utime(path, ns=(0, 0))
+        assert path not in state
+
+    def test_missing_file(self, *, tmp_path: Path) -> None:
+        path = tmp_path.joinpath("foo.pdf")
+        _ = path.write_bytes(_PDF)
+        state = SessionState(path=tmp_path.joinpath("session.json"))
+        state.add_skip(path)
+        path.unlink()
+        assert path not in state
+
+    def test_invalid(self, *, tmp_path: Path) -> None:
+        path = tmp_path.joinpath("session.json")
+        _ = path.write_text("invalid")
+        assert len(SessionState.load(path)) == 0
+
+    def test_position(self, *, tmp_path: Path) -> None:
+        path = tmp_path.joinpath("session.json")
+        SessionState(path=path).set_position(tmp_path.joinpath("foo.pdf"))
+        assert SessionState.load(path).position == tmp_path.joinpath("foo.pdf")
+
+    def test_reset(self, *, tmp_path: Path) -> None:
+        inbox = tmp_path.joinpath("inbox")
+        inbox.mkdir()
+        path = inbox.joinpath("foo.pdf")
+        _ = path.write_bytes(_PDF)
+        state = SessionState(path=tmp_path.joinpath("session.json"))
+        state.add_skip(path)
+        state.set_position(path)
+        assert get_next_file(path=inbox, skips=state) is None
+        state.reset()
+        loaded = SessionState.load(tmp_path.joinpath("session.json"))
+        assert get_next_file(path=inbox, skips=loaded, start=loaded.position) == path
@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+
+from pytest import mark, param
+
+from rename_books.stream import normalize_lines
+
+
+class TestNormalizeLines:
+    def test_main(self) -> None:
+        lines = [
+            "2000 — Title (Author)\n",
+            "Author - Title (2000)\n",
+            "dir/Author - Title (2000).pdf\n",
+            "Title\n",
+        ]
+        assert list(normalize_lines(lines)) == [
+            "2000 — Title (Author)\t2000 — Title (Author)\tnormalized\n",
+            "Author - Title (2000)\t2000 — Title (Author)\tchanged\n",
+            "dir/Author - Title (2000).pdf\tdir/2000 — Title (Author).pdf\tchanged\n",
+            "Title\t\terror\n",
+        ]
+
+    @mark.parametrize("window", [param(1), param(2), param(None)])
+    def test_executor(self, *, window: int | None) -> None:
+        lines = [f"Author - Title {i} (2000)\n" for i in range(25)]
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            rows = list(
+                normalize_lines(lines, executor=executor, chunk_size=3, window=window)
+            )
+        assert rows == list(normalize_lines(lines))
+        assert [r.split("\t")[0] for r in rows] == [line.strip() for line in lines]
+
+    def test_unparseable_lines_in_batch(self) -> None:
+        lines = ["Author - Title (2000)\n", "--draft\n", " -c\n", "---\n"]
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            rows = list(normalize_lines(lines, executor=executor, chunk_size=4))
+        assert rows == [
+            "Author - Title (2000)\t2000 — Title (Author)\tchanged\n",
+            "--draft\t\terror\n",
+            " -c\t\terror\n",
+            "---\t\terror\n",
+        ]
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from pytest import fixture, mark, param, raises
+
+from rename_books.lib import get_next_file
+from rename_books.tracing import (
+    _NULL_SPAN,
+    _percentile,
+    disable_tracing,
+    enable_tracing,
+    read_trace,
+    repr_trace_summary,
+    span,
+    summarize_trace,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from pathlib import Path
+
+
+@fixture
+def trace(*, tmp_path: Path) -> Iterator[Path]:
+    path = tmp_path.joinpath("trace.jsonl")
+    enable_tracing(path)
+    try:
+        yield path
+    finally:
+        disable_tracing()
+
+
+class TestPercentile:
+    @mark.parametrize(
+        ("percent", "expected"),
+        [param(0, 1.0), param(50, 5.0), param(90, 9.0), param(99, 10.0)],
+    )
+    def test_main(self, *, percent: float, expected: float) -> None:
+        values = [float(i) for i in range(1, 11)]
+        assert _percentile(values, percent) == expected
+
+
+class TestSpan:
+    def test_disabled(self) -> None:
+        assert span("foo", bar=1) is _NULL_SPAN
+
+    def test_main(self, *, trace: Path) -> None:
+        with span("outer", key="value"), span("inner"):
+            pass
+        with raises(ZeroDivisionError), span("error"):
+            _ = 1 / 0
+        inner, outer, error = read_trace(trace)
+        assert inner["name"] == "inner"
+        assert outer["name"] == "outer"
+        assert outer["attrs"] == {"key": "value"}
+        assert inner["parent"] == outer["id"]
+        assert outer["parent"] is None
+        assert outer["duration"] >= inner["duration"] >= 0.0
+        assert error["error"] == "ZeroDivisionError"
+
+    def test_instrumented(self, *, tmp_path: Path, trace: Path) -> None:
+        inbox = tmp_path.joinpath("inbox")
+        inbox.mkdir()
+        _ = inbox.joinpath("Author - Title (2000).pdf").write_bytes(b"%PDF-1.7\n")
+        assert get_next_file(path=inbox) is not None
+        names = {e["name"] for e in read_trace(trace)}
+        assert names == {"from_path", "get_next_file"}
+
+
+class TestSummarizeTrace:
+    def test_main(self, *, trace: Path) -> None:
+        for _ in range(3):
+            with span("foo"):
+                pass
+        with span("bar"):
+            pass
+        summaries = summarize_trace(read_trace(trace))
+        assert {s.name: s.count for s in summaries} == {"foo": 3, "bar": 1}
+        for summary in summaries:
+            assert summary.p50 <= summary.p90 <= summary.p99 <= summary.max
+        table = repr_trace_summary(summaries)
+        assert "foo" in table
+        assert "p99" in table
+
+    def test_truncated(self, *, tmp_path: Path) -> None:
+        path = tmp_path.joinpath("trace.jsonl")
+        _ = path.write_text('{"name": "foo", "duration": 1.0}\n{"name": "ba')
+        (summary,) = summarize_trace(read_trace(path))
+        assert summary.name == "foo"